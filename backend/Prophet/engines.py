@@ -0,0 +1,268 @@
+"""
+Forecasting engine registry for Pink Cafe forecasting.
+
+Every engine takes a (ds, y) daily history and a preset settings dict and
+exposes the same interface:
+
+    engine = get_engine("sarima")
+    engine.fit(history, cfg)
+    forecast_df = engine.predict(horizon_days)   # date, yhat, yhat_lower, yhat_upper
+
+Built in: 'prophet' (the preset-driven model), 'sarima' and
+'linear_regression' (the models comparison.py backtests), and 'baseline',
+a pure-NumPy seasonal-naive / exponential-smoothing model that answers in
+milliseconds. New engines register themselves with @register_engine.
+
+Each engine imports its modelling library (prophet, statsmodels) inside
+fit(), so loading the registry stays cheap; prewarm_engines() imports them
+all up front.
+"""
+
+import warnings
+from abc import ABC, abstractmethod
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+_ENGINES: dict = {}
+
+
+def register_engine(name: str):
+    """Class decorator: make an engine available to get_engine() under name."""
+    def decorator(cls):
+        cls.name = name
+        _ENGINES[name] = cls
+        return cls
+    return decorator
+
+
+def engine_names() -> list[str]:
+    return list(_ENGINES)
+
+
+def get_engine(name: str):
+    """Return a new, unfitted engine. Raises ValueError for an unknown name."""
+    if name not in _ENGINES:
+        raise ValueError(f"Algorithm '{name}' not supported (use one of: {', '.join(_ENGINES)})")
+    return _ENGINES[name]()
+
+
+class ForecastEngine(ABC):
+    """Base class: fit on a (ds, y) history, then predict the following days."""
+
+    name = None
+    # Fits slow enough to be worth farming out to the forecast process pool
+    parallel = True
+    # Whether params() returns state that fit(init=...) can warm-start from
+    warm_start = False
+
+    @abstractmethod
+    def fit(self, history: pd.DataFrame, cfg: dict, init: dict = None) -> "ForecastEngine":
+        """Fit on history (warm-started from init, if given) and return self."""
+
+    @abstractmethod
+    def predict(self, horizon_days: int) -> pd.DataFrame:
+        """Forecast the horizon_days after the history's last date."""
+
+    def params(self):
+        """Fitted state worth storing to warm-start the next fit, or None."""
+        return None
+
+    def _future_dates(self, horizon_days: int) -> pd.DatetimeIndex:
+        return pd.date_range(self.last_date + pd.Timedelta(days=1), periods=horizon_days, freq="D")
+
+    @staticmethod
+    def _frame(dates, yhat, half_width) -> pd.DataFrame:
+        """Build the common forecast frame, clamped to non-negative sales."""
+        yhat = np.asarray(yhat, dtype=float)
+        return pd.DataFrame({
+            "date": dates,
+            "yhat": np.clip(yhat, 0, None),
+            "yhat_lower": np.clip(yhat - half_width, 0, None),
+            "yhat_upper": np.clip(yhat + half_width, 0, None),
+        })
+
+
+def prewarm_engines() -> None:
+    """Import every engine's modelling library now rather than on its first fit."""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX  # noqa: F401
+
+
+def _z(cfg: dict) -> float:
+    """Two-sided normal quantile for the preset's interval_width."""
+    return NormalDist().inv_cdf(0.5 + float(cfg.get("interval_width", 0.8)) / 2)
+
+
+@register_engine("prophet")
+class ProphetEngine(ForecastEngine):
+    """The preset-driven Prophet model (cached, optionally warm-started)."""
+
+    warm_start = True
+
+    def fit(self, history, cfg, init=None):
+        # Imported here: forecasting imports this module
+        from forecasting import fit_prophet
+
+        self.model = fit_prophet(history, cfg, init=init)
+        self.history = history
+        self.cfg = cfg
+        return self
+
+    def predict(self, horizon_days):
+        from forecasting import _prophet_predict
+        return _prophet_predict(self.model, self.history, horizon_days, self.cfg)
+
+    def params(self):
+        from forecasting import warm_start_params
+        return warm_start_params(self.model)
+
+
+@register_engine("sarima")
+class SarimaEngine(ForecastEngine):
+    """Weekly seasonal SARIMA(1,1,1)(1,1,1,7), falling back to ARMA(1,1)."""
+
+    def fit(self, history, cfg, init=None):
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+        y_train = history.set_index("ds")["y"].asfreq("D").ffill()  # fill any gaps in daily data
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                self.fitted = SARIMAX(
+                    y_train,
+                    order=(1, 1, 1),
+                    seasonal_order=(1, 1, 1, 7),
+                    enforce_stationarity=False,
+                    enforce_invertibility=False,
+                ).fit(disp=False, maxiter=200)
+            except Exception:
+                # Fallback: simple ARMA (no seasonal component)
+                self.fitted = SARIMAX(
+                    y_train,
+                    order=(1, 0, 1),
+                    seasonal_order=(0, 0, 0, 0),
+                    enforce_stationarity=False,
+                    enforce_invertibility=False,
+                ).fit(disp=False, maxiter=200)
+        self.last_date = y_train.index[-1]
+        self.alpha = 1 - float(cfg.get("interval_width", 0.8))
+        return self
+
+    def predict(self, horizon_days):
+        forecast = self.fitted.get_forecast(steps=horizon_days)
+        yhat = forecast.predicted_mean.to_numpy()
+        bounds = forecast.conf_int(alpha=self.alpha).to_numpy()
+        return self._frame(self._future_dates(horizon_days), yhat, (bounds[:, 1] - bounds[:, 0]) / 2)
+
+
+@register_engine("linear_regression")
+class LinearRegressionEngine(ForecastEngine):
+    """
+    Linear trend plus day-of-week effects, solved by least squares.
+
+    fit_batch() fits many items at once: their design matrices are stacked
+    (zero-padded to a common length, which leaves each item's solution
+    unchanged) and solved in a single batched pseudo-inverse, giving every
+    item its own coefficients for roughly the cost of one fit.
+    """
+
+    parallel = False
+
+    def _features(self, ds):
+        # [day index, 7 day-of-week dummies]; the dummies sum to 1, so they
+        # also carry the intercept
+        days = np.asarray(ds, dtype="datetime64[D]").astype(np.int64)
+        dow = (days + 3) % 7    # 1970-01-01 was a Thursday; Monday = 0
+        return np.hstack([(days - self.ref_day).reshape(-1, 1), np.eye(7)[dow]])
+
+    def fit(self, history, cfg, init=None):
+        return self.fit_batch({None: history}, cfg)[None]
+
+    @classmethod
+    def fit_batch(cls, histories: dict, cfg: dict) -> dict:
+        """Fit one engine per {key: history} with a single batched solve. Returns {key: engine}."""
+        engines = {key: cls() for key in histories}
+        lengths = np.array([len(h) for h in histories.values()])
+        X = np.zeros((len(histories), lengths.max(), 8))
+        y = np.zeros((len(histories), lengths.max()))
+
+        for i, (engine, history) in enumerate(zip(engines.values(), histories.values())):
+            # Day index is measured from the start of each item's training data
+            ds = history["ds"].to_numpy(dtype="datetime64[D]")
+            engine.ref_day = ds.min().astype(np.int64)
+            engine.last_date = pd.Timestamp(ds.max())
+            X[i, :lengths[i]] = engine._features(ds)
+            y[i, :lengths[i]] = history["y"].to_numpy(dtype=float)
+
+        # Least squares through the 8x8 normal equations of every item at
+        # once; pinv gives the minimum-norm solution if a weekday is missing
+        Xt = X.transpose(0, 2, 1)
+        coefs = np.einsum("kfg,kg->kf", np.linalg.pinv(Xt @ X), np.einsum("kfn,kn->kf", Xt, y))
+        residuals = y - np.einsum("knf,kf->kn", X, coefs)
+        valid = np.arange(X.shape[1]) < lengths[:, None]
+        mean = residuals.sum(axis=1) / lengths
+        std = np.sqrt((((residuals - mean[:, None]) * valid) ** 2).sum(axis=1) / lengths)
+
+        z = _z(cfg)
+        for i, engine in enumerate(engines.values()):
+            engine.coef = coefs[i]
+            engine.half_width = z * float(std[i])
+        return engines
+
+    def predict(self, horizon_days):
+        return self.predict_dates(self._future_dates(horizon_days))
+
+    def predict_dates(self, dates) -> pd.DataFrame:
+        """Predict arbitrary dates (the backtests score the test rows' own dates)."""
+        return self._frame(dates, self._features(dates) @ self.coef, self.half_width)
+
+
+@register_engine("baseline")
+class BaselineEngine(ForecastEngine):
+    """
+    Seasonal-naive exponential smoothing in pure NumPy.
+
+    The forecast is an exponentially smoothed level of the deseasonalised
+    series plus a weekly profile (day-of-week means of the last few weeks).
+    """
+
+    parallel = False
+
+    ALPHA = 0.3          # smoothing weight of the newest observation
+    SEASON = 7
+    PROFILE_WEEKS = 4
+
+    def fit(self, history, cfg, init=None):
+        y = history["y"].to_numpy(dtype=float)
+        ds = pd.to_datetime(history["ds"])
+        n = len(y)
+        dow = ds.dt.dayofweek.to_numpy()
+
+        # Weekly profile from the most recent PROFILE_WEEKS weeks
+        recent = slice(max(0, n - self.SEASON * self.PROFILE_WEEKS), n)
+        sums = np.bincount(dow[recent], weights=y[recent], minlength=self.SEASON)
+        counts = np.bincount(dow[recent], minlength=self.SEASON)
+        profile = np.divide(sums, counts, out=np.zeros(self.SEASON), where=counts > 0)
+        profile = np.where(counts > 0, profile - profile[counts > 0].mean(), 0.0)
+
+        # Simple exponential smoothing, closed form: weights alpha * (1 - alpha)^age
+        deseasonalised = y - profile[dow]
+        ages = np.arange(n - 1, -1, -1)
+        weights = self.ALPHA * (1 - self.ALPHA) ** ages
+        weights[0] = (1 - self.ALPHA) ** (n - 1)   # the oldest point carries the remaining weight
+        self.level = float(weights @ deseasonalised)
+
+        # Interval from in-sample seasonal-naive errors
+        if n > self.SEASON:
+            errors = y[self.SEASON:] - y[:-self.SEASON]
+            self.half_width = _z(cfg) * float(np.sqrt(np.mean(errors ** 2)))
+        else:
+            self.half_width = _z(cfg) * float(np.std(y))
+        self.profile = profile
+        self.last_date = ds.max()
+        return self
+
+    def predict(self, horizon_days):
+        dates = self._future_dates(horizon_days)
+        return self._frame(dates, self.level + self.profile[dates.dayofweek.to_numpy()], self.half_width)
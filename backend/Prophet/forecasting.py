@@ -1,12 +1,31 @@
 """
 Prophet forecasting implementation for Pink Cafe.
 Renamed from prophet.py to avoid naming conflict with the Prophet library.
+
+The prophet library (with cmdstanpy and matplotlib) is imported on first
+use, not at module import, so processes that never fit a model - auth-only
+gunicorn workers, the app at startup - don't pay for it. prewarm_models()
+loads it ahead of time, e.g. from gunicorn's post_fork hook.
 """
 
+import json
+import numpy as np
 import pandas as pd
 import logging
-from prophet import Prophet  # This now imports the library correctly
+from concurrent.futures import as_completed
+from typing import TYPE_CHECKING
+from config import FORECAST_WORKERS
+from executors import get_process_pool, is_main_process
 from prophet_settings import get_active_preset, get_preset
+from model_cache import MODEL_CACHE, preset_fingerprint
+from result_store import get_result_columns_json, get_result_json, save_result, save_result_columns
+from param_store import get_params, save_params
+from engines import get_engine
+from metrics import collect_stages, merge_stages, timed
+from sales_store import read_dataset, read_item
+
+if TYPE_CHECKING:
+    from prophet import Prophet
 
 # Suppress Prophet's verbose output
 logging.getLogger("prophet").setLevel(logging.WARNING)
@@ -48,78 +67,486 @@ def load_history(conn, dataset_id, item_id, train_weeks):
     if not (4 <= train_weeks <= 52):
         raise ForecastError("train_weeks must be between 4 and 52")
 
+    # Fast path: slice the memory-mapped column file (see sales_store.py)
+    with timed("columnar", "load_history"):
+        columns = read_item(conn, dataset_id, item_id)
+        if columns is not None:
+            return _check_history(_columns_frame(*columns, train_weeks))
+
+    # The train_weeks cutoff is applied in SQL, so only the rows actually
+    # used are fetched: one range of the (dataset_id, item_id, day) key
     query = """
-        SELECT date, quantity
+        SELECT day, quantity
         FROM sales
         WHERE dataset_id = ? AND item_id = ?
-        ORDER BY date
+          AND day >= (
+            SELECT MAX(day) - ?
+            FROM sales
+            WHERE dataset_id = ? AND item_id = ?
+          )
+        ORDER BY day
     """
-    rows = conn.execute(query, (dataset_id, item_id)).fetchall()
+    with timed("sql", "load_history"):
+        days, quantities = _fetch_columns(
+            conn, query, (dataset_id, item_id, _window_days(train_weeks), dataset_id, item_id), 2
+        )
 
-    if not rows:
+    if len(days) == 0:
         raise ForecastError(f"No sales data found for dataset_id={dataset_id}, item_id={item_id}")
 
-    history = pd.DataFrame([
-        {"ds": pd.to_datetime(row["date"]), "y": float(row["quantity"])}
-        for row in rows
-    ])
+    return _check_history(_history_frame(days, quantities))
+
+
+def load_dataset_histories(conn, dataset_id, train_weeks):
+    """
+    Load the training history of every item in a dataset in one SQL pass.
+
+    Returns {item_id: history DataFrame or ForecastError}; an item with too
+    little data maps to the error instead of failing the whole dataset.
+    """
+    if not (4 <= train_weeks <= 52):
+        raise ForecastError("train_weeks must be between 4 and 52")
+
+    with timed("columnar", "load_dataset_histories"):
+        stored = read_dataset(conn, dataset_id)
+        if stored is not None:
+            histories = {}
+            for item_id, days, quantities in stored:
+                try:
+                    histories[item_id] = _check_history(_columns_frame(days, quantities, train_weeks))
+                except ForecastError as e:
+                    histories[item_id] = e
+            return histories
+
+    # Each item is trimmed to its own last train_weeks weeks in SQL. Driving
+    # the query from items makes every per-item MAX(day) a single key lookup
+    # and every history one range of the (dataset_id, item_id, day) key,
+    # already in the order the rows are returned.
+    query = """
+        WITH latest AS (
+          SELECT i.id AS item_id,
+                 (SELECT MAX(day) FROM sales WHERE dataset_id = ? AND item_id = i.id) - ? AS cutoff
+          FROM items i
+        )
+        SELECT s.item_id, s.day, s.quantity
+        FROM latest CROSS JOIN sales s
+        WHERE latest.cutoff IS NOT NULL
+          AND s.dataset_id = ? AND s.item_id = latest.item_id AND s.day >= latest.cutoff
+        ORDER BY s.item_id, s.day
+    """
+    with timed("sql", "load_dataset_histories"):
+        item_ids, days, quantities = _fetch_columns(
+            conn, query, (dataset_id, _window_days(train_weeks), dataset_id), 3
+        )
+
+    if len(item_ids) == 0:
+        raise ForecastError(f"No sales data found for dataset_id={dataset_id}")
+
+    # Rows are sorted by item, so each item is one contiguous slice
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, item_ids[1:] != item_ids[:-1]])
+    ends = np.r_[starts[1:], len(item_ids)]
 
-    cutoff_date = history["ds"].max() - pd.Timedelta(weeks=train_weeks)
-    history = history[history["ds"] >= cutoff_date].copy()
+    histories = {}
+    for start, end in zip(starts, ends):
+        item_id = int(item_ids[start])
+        try:
+            histories[item_id] = _check_history(_history_frame(days[start:end], quantities[start:end]))
+        except ForecastError as e:
+            histories[item_id] = e
+    return histories
 
+
+def _window_days(train_weeks):
+    """Days between the first and last day of a train_weeks training window."""
+    return int(train_weeks) * 7
+
+
+def _fetch_columns(conn, query, params, n_columns):
+    """Run query and return its result as n_columns column tuples (no sqlite3.Row objects)."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute(query, params).fetchall()
+    if not rows:
+        return ((),) * n_columns
+    return tuple(zip(*rows))
+
+
+def _history_frame(days, quantities):
+    """Build a (ds, y) history frame from day numbers and quantities in one vectorized pass."""
+    return pd.DataFrame({
+        "ds": np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype("datetime64[ns]"),
+        "y": np.asarray(quantities, dtype=np.float64),
+    })
+
+
+def _columns_frame(days, quantities, train_weeks):
+    """
+    Build a history frame from an item's day-number / quantity columns,
+    keeping the same last train_weeks weeks as the SQL cutoff.
+    """
+    start = int(np.searchsorted(days, days[-1] - _window_days(train_weeks), side="left"))
+    return _history_frame(days[start:], quantities[start:])
+
+
+def _check_history(history):
+    """Raise if under a week of training history remains."""
     if len(history) < 7:
         raise ForecastError(f"Insufficient data: only {len(history)} days available for training")
-
     return history
 
 
+def _normalise_horizons(horizon_weeks):
+    """
+    Validate horizon_weeks (an int or a list of ints) and return a sorted,
+    de-duplicated list of horizons.
+    """
+    raw = horizon_weeks if isinstance(horizon_weeks, (list, tuple)) else [horizon_weeks]
+    if not raw:
+        raise ForecastError("At least one horizon_weeks value is required")
+
+    horizons = sorted({int(h) for h in raw})
+    for h in horizons:
+        if not (1 <= h <= 52):
+            raise ForecastError("horizon_weeks must be between 1 and 52")
+    return horizons
+
+
+def _engine_for(algorithm):
+    """Return an unfitted engine for algorithm, as a ForecastError if it's unknown."""
+    try:
+        return get_engine(algorithm)
+    except ValueError as e:
+        raise ForecastError(str(e))
+
+
+def _result_hash(algorithm, preset_hash):
+    """
+    Key stored results by engine as well as preset. Prophet keeps the bare
+    preset hash so results stored before other engines existed stay valid.
+    """
+    return preset_hash if algorithm == "prophet" else f"{algorithm}:{preset_hash}"
+
+
 def run_forecast(conn, dataset_id, item_id, algorithm, train_weeks, horizon_weeks=4):
     """
     Entry point called by routes.py to generate a forecast.
 
+    algorithm names an engine in engines.py: 'prophet' for the preset-driven
+    model, or a faster one such as 'baseline' when speed matters more than
+    accuracy. horizon_weeks may be a single int or a list of ints. For a
+    list, the model is fitted once, predicted at the longest horizon, and the
+    result is sliced into one forecast per requested horizon (keyed by
+    horizon in "forecasts").
+
     Returns a dict ready to be JSON-serialized with forecast data.
     """
-    if algorithm != "prophet":
-        raise ForecastError(f"Algorithm '{algorithm}' not supported (use 'prophet')")
+    return json.loads(run_forecast_json(conn, dataset_id, item_id, algorithm, train_weeks, horizon_weeks))
+
+
+def run_forecast_json(conn, dataset_id, item_id, algorithm, train_weeks, horizon_weeks=4,
+                      columnar=False):
+    """
+    run_forecast, returning the result as JSON text: a stored result is
+    returned as stored, without being parsed and re-encoded.
+
+    columnar=True returns the columnar form instead (see
+    forecast_columns_json). It is stored next to the row form; a result
+    stored before that existed is converted once and its columns saved.
+    """
+    engine = _engine_for(algorithm)
+    _normalise_horizons(horizon_weeks)
 
-    if not (1 <= horizon_weeks <= 52):
-        raise ForecastError("horizon_weeks must be between 1 and 52")
+    # Serve a stored result if this exact request was computed before
+    active_name = get_active_preset(conn)
+    cfg = get_preset(conn, active_name)
+    preset_hash = preset_fingerprint(cfg)
+    result_hash = _result_hash(algorithm, preset_hash)
+    key = ("forecast", dataset_id, item_id, train_weeks, horizon_weeks, result_hash)
+    if not columnar:
+        stored = get_result_json(conn, *key)
+        if stored is not None:
+            return stored
+    else:
+        stored = get_result_columns_json(conn, *key)
+        if stored is not None:
+            result, columns = stored
+            if columns is None:
+                columns = _dumps(_columns_from_result(json.loads(result)))
+                save_result_columns(conn, *key, columns)
+            return columns
 
     history = load_history(conn, dataset_id, item_id, train_weeks)
-    
-    # Run Prophet forecast
-    horizon_days = horizon_weeks * 7
-    forecast_df = _prophet_forecast(history, horizon_days, conn)
-    
-    # Convert to JSON-serializable format
-    forecast_df["date"] = forecast_df["date"].astype(str)
-    
-    return {
-        "success": True,
-        "algorithm": "prophet",
-        "train_weeks": train_weeks,
-        "horizon_weeks": horizon_weeks,
-        "forecast": forecast_df.to_dict(orient="records")
-    }
+    init = get_params(conn, dataset_id, item_id, preset_hash) if engine.warm_start else None
+    result, columns, params = _forecast_from_history(history, cfg, train_weeks, horizon_weeks, init, algorithm)
+
+    if params is not None:
+        save_params(conn, dataset_id, item_id, active_name, preset_hash, params)
+    save_result(conn, "forecast", dataset_id, item_id, train_weeks, horizon_weeks,
+                active_name, result_hash, result, columns)
+    return columns if columnar else result
 
 
-def _prophet_forecast(history: pd.DataFrame, horizon_days: int, conn) -> pd.DataFrame:
+def iter_dataset_forecasts_json(conn, dataset_id, algorithm, train_weeks, horizon_weeks=4):
     """
-    Run Prophet forecast using settings from the database.
-    
-    Args:
-        history: DataFrame with columns 'ds' (datetime) and 'y' (float)
-        horizon_days: Number of days to forecast into the future
-        conn: Database connection (required)
-    
-    Returns:
-        DataFrame with columns: date, yhat, yhat_lower, yhat_upper
+    Forecast every item in a dataset, yielding one result per item as JSON
+    text (one line, no trailing newline).
+
+    Histories are loaded in a single query and the items are fitted in
+    parallel across FORECAST_WORKERS processes. Results are yielded as each
+    item finishes (stored results first), so the caller can stream them.
+    Each object has the same shape as run_forecast's result, plus item_id /
+    item_name; a failed item yields {"success": false, "item_id",
+    "item_name", "message"}. Engines that fit in milliseconds skip the pool
+    and run inline, and engines with a fit_batch() fit every pending item
+    in one call, falling back to one fit per item if the batch fails. Results go from the model (or the result store) to JSON
+    text without being built as, or parsed into, per-row dicts.
     """
-    # Load active preset settings from database using prophet_settings functions
+    engine = _engine_for(algorithm)
+    _normalise_horizons(horizon_weeks)
+    histories = load_dataset_histories(conn, dataset_id, train_weeks)
+
+    names = {
+        int(row["id"]): row["name"]
+        for row in conn.execute(
+            f"SELECT id, name FROM items WHERE id IN ({','.join('?' * len(histories))})",
+            list(histories),
+        ).fetchall()
+    }
+
     active_name = get_active_preset(conn)
     cfg = get_preset(conn, active_name)
-    
-    # Build model with DB settings
+    preset_hash = preset_fingerprint(cfg)
+    result_hash = _result_hash(algorithm, preset_hash)
+
+    def _tagged(item_id, result_json):
+        # Splice the item fields into the front of the result object
+        tag = _dumps({"item_id": item_id, "item_name": names.get(item_id)})
+        return tag[:-1] + "," + result_json[1:]
+
+    def _failed(item_id, error):
+        return _dumps({"item_id": item_id, "item_name": names.get(item_id), "success": False, "message": str(error)})
+
+    pending = {}
+    for item_id, history in histories.items():
+        if isinstance(history, ForecastError):
+            yield _failed(item_id, history)
+            continue
+        stored = get_result_json(conn, "forecast", dataset_id, item_id, train_weeks, horizon_weeks, result_hash)
+        if stored is not None:
+            yield _tagged(item_id, stored)
+        else:
+            pending[item_id] = history
+
+    def _store(item_id, fitted):
+        result, columns, params = fitted
+        if params is not None:
+            save_params(conn, dataset_id, item_id, active_name, preset_hash, params)
+        save_result(conn, "forecast", dataset_id, item_id, train_weeks, horizon_weeks,
+                    active_name, result_hash, result, columns)
+        return _tagged(item_id, result)
+
+    inits = {
+        item_id: get_params(conn, dataset_id, item_id, preset_hash) if engine.warm_start else None
+        for item_id in pending
+    }
+
+    if pending and hasattr(engine, "fit_batch"):
+        try:
+            with timed("fit", f"{algorithm}_batch"):
+                fitted = engine.fit_batch(pending, cfg)
+        except Exception:
+            # One bad history fails the whole batch: fit the items one by one
+            # below, so only the bad ones fail
+            logging.exception("Batched forecast failed for dataset %s, fitting items separately", dataset_id)
+        else:
+            for item_id, item_engine in fitted.items():
+                try:
+                    yield _store(item_id, _forecast_result(item_engine, train_weeks, horizon_weeks))
+                except Exception as e:
+                    logging.exception("Forecast failed for item %s", item_id)
+                    yield _failed(item_id, e if isinstance(e, ForecastError) else "Forecast failed")
+            return
+
+    if FORECAST_WORKERS <= 1 or len(pending) <= 1 or not engine.parallel or not is_main_process():
+        for item_id, history in pending.items():
+            try:
+                yield _store(item_id, _forecast_from_history(
+                    history, cfg, train_weeks, horizon_weeks, inits[item_id], algorithm
+                ))
+            except Exception as e:
+                logging.exception("Forecast failed for item %s", item_id)
+                yield _failed(item_id, e if isinstance(e, ForecastError) else "Forecast failed")
+        return
+
+    pool = get_process_pool("forecast", FORECAST_WORKERS)
+    futures = {
+        pool.submit(
+            collect_stages, _forecast_from_history, history, cfg, train_weeks, horizon_weeks, inits[item_id], algorithm
+        ): item_id
+        for item_id, history in pending.items()
+    }
+    for future in as_completed(futures):
+        item_id = futures[future]
+        try:
+            yield _store(item_id, merge_stages(future.result()))
+        except Exception as e:
+            logging.exception("Forecast failed for item %s", item_id)
+            yield _failed(item_id, e if isinstance(e, ForecastError) else "Forecast failed")
+
+
+def _forecast_from_history(history, cfg, train_weeks, horizon_weeks, init=None, algorithm="prophet"):
+    """
+    Fit the algorithm's engine once at the longest horizon and build
+    run_forecast's result as JSON text.
+
+    init warm-starts the fit from stored parameters (see param_store).
+    Returns (result JSON, columnar result JSON, fitted parameters to store
+    for the next refit, or None for engines without warm starts).
+    Takes no DB connection so it can run in a pool process.
+    """
+    with timed("fit", algorithm):
+        engine = _engine_for(algorithm).fit(history, cfg, init=init)
+    return _forecast_result(engine, train_weeks, horizon_weeks)
+
+
+def _forecast_result(engine, train_weeks, horizon_weeks):
+    """
+    Predict with a fitted engine at the longest horizon; return (result JSON,
+    columnar result JSON, params).
+    """
+    horizons = _normalise_horizons(horizon_weeks)
+    algorithm = engine.name
+
+    # Run the forecast once, at the longest requested horizon
+    horizon_days = max(horizons) * 7
+    with timed("predict", algorithm):
+        forecast_df = engine.predict(horizon_days)
+    params = engine.params()
+
+    with timed("serialize", "forecast_json"):
+        rows = forecast_row_json(forecast_df)
+        columns = forecast_columns_json(forecast_df)
+        if not isinstance(horizon_weeks, (list, tuple)):
+            head = {"success": True, "algorithm": algorithm, "train_weeks": train_weeks,
+                    "horizon_weeks": horizon_weeks}
+            body = '"forecast":[' + ",".join(rows) + "]"
+        else:
+            head = {"success": True, "algorithm": algorithm, "train_weeks": train_weeks,
+                    "horizon_weeks": horizons}
+            body = '"forecasts":{' + ",".join(
+                f'"{h}":[' + ",".join(rows[:h * 7]) + "]" for h in horizons
+            ) + "}"
+        head_json = _dumps(head)[:-1]
+        return head_json + "," + body + "}", head_json + ',"forecast":' + columns + "}", params
+
+
+# One forecast row as JSON; %r of a float is exactly what json.dumps writes
+_ROW_JSON = '{"date":"%s","yhat":%r,"yhat_lower":%r,"yhat_upper":%r}'
+
+
+def forecast_row_json(forecast_df) -> list[str]:
+    """
+    Return each row of a (date, yhat, yhat_lower, yhat_upper) forecast frame
+    as a JSON object, formatted straight from the column arrays rather than
+    through a dict per row.
+    """
+    dates = np.datetime_as_string(forecast_df["date"].to_numpy(dtype="datetime64[D]"), unit="D").tolist()
+    columns = [forecast_df[name].to_numpy(dtype=np.float64) for name in ("yhat", "yhat_lower", "yhat_upper")]
+    if not all(np.isfinite(column).all() for column in columns):
+        # NaN / inf have no %r spelling json.loads accepts; let json write them
+        return [
+            _dumps({"date": date, "yhat": yhat, "yhat_lower": lower, "yhat_upper": upper})
+            for date, yhat, lower, upper in zip(dates, *(column.tolist() for column in columns))
+        ]
+    return [_ROW_JSON % row for row in zip(dates, *(column.tolist() for column in columns))]
+
+
+def forecast_columns_json(forecast_df) -> str:
+    """
+    Return a forecast frame in columnar form as JSON: the start date and one
+    array per series, a value per consecutive day, e.g.
+    {"start": "2025-01-06", "yhat": [...], "yhat_lower": [...], "yhat_upper": [...]}.
+    The arrays are encoded straight from the frame's columns.
+    """
+    dates = forecast_df["date"].to_numpy(dtype="datetime64[D]")
+    start = np.datetime_as_string(dates[0], unit="D") if len(dates) else None
+    series = ",".join(
+        f'"{name}":' + _dumps(forecast_df[name].to_numpy(dtype=np.float64).tolist())
+        for name in ("yhat", "yhat_lower", "yhat_upper")
+    )
+    return '{"start":' + _dumps(start) + "," + series + "}"
+
+
+def split_forecast_rows(result: dict):
+    """
+    Split a forecast result into (header fields, rows). For a list of
+    horizons the rows are the longest horizon's; horizon h is their first
+    h * 7.
+    """
+    head = dict(result)
+    if "forecasts" in head:
+        forecasts = head.pop("forecasts")
+        return head, forecasts[str(max(head["horizon_weeks"]))]
+    return head, head.pop("forecast")
+
+
+def split_forecast_json(result_json: str):
+    """
+    Split a forecast result's JSON text into (header JSON, rows JSON): the
+    result without its rows, and the longest horizon's row objects joined by
+    commas. The rows are cut out of the text along the boundaries
+    _forecast_result writes, without parsing them; text in any other layout
+    (stored before results were compact) is parsed instead.
+    """
+    single = result_json.rfind(',"forecast":[')
+    multi = result_json.rfind(',"forecasts":{')
+    if single != -1 and result_json.endswith("]}"):
+        return result_json[:single] + "}", result_json[single + len(',"forecast":['):-2]
+    if multi != -1 and result_json.endswith("]}}"):
+        head = result_json[:multi] + "}"
+        key = '"%d":[' % max(json.loads(head)["horizon_weeks"])
+        start = result_json.index(key, multi) + len(key)
+        return head, result_json[start:result_json.index("]", start)]
+    head, rows = split_forecast_rows(json.loads(result_json))
+    return _dumps(head), ",".join(_dumps(row) for row in rows)
+
+
+def _columns_from_result(result: dict) -> dict:
+    """
+    Convert a parsed row-form result to the columnar form _forecast_result
+    writes (see forecast_columns_json), for results stored before it did.
+    For a list of horizons "forecast" holds the longest one.
+    """
+    head, rows = split_forecast_rows(result)
+    head["forecast"] = {
+        "start": rows[0]["date"] if rows else None,
+        "yhat": [row["yhat"] for row in rows],
+        "yhat_lower": [row["yhat_lower"] for row in rows],
+        "yhat_upper": [row["yhat_upper"] for row in rows],
+    }
+    return head
+
+
+def _dumps(obj) -> str:
+    """Compact JSON, the encoding used for stored and streamed forecast results."""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def prewarm_models() -> None:
+    """Import the modelling libraries now rather than on the first forecast."""
+    import prophet  # noqa: F401
+    import prophet.serialize  # noqa: F401
+    from engines import prewarm_engines
+    prewarm_engines()
+
+
+def build_prophet(cfg: dict) -> "Prophet":
+    """Build an unfitted Prophet model from a preset settings dict."""
+    from prophet import Prophet
+
     m = Prophet(
         growth=cfg["growth"],
         changepoint_prior_scale=cfg["changepoint_prior_scale"],
@@ -133,13 +560,7 @@ def _prophet_forecast(history: pd.DataFrame, horizon_days: int, conn) -> pd.Data
         interval_width=cfg["interval_width"],
         holidays_prior_scale=cfg["holidays_prior_scale"]
     )
-    
-    # Handle logistic growth
-    if cfg["growth"] == "logistic":
-        history = history.copy()
-        history["floor"] = cfg["floor_multiplier"] * history["y"].min()
-        history["cap"] = cfg["cap_multiplier"] * history["y"].max()
-    
+
     # Add custom seasonality if enabled
     if cfg["custom_seasonality_enabled"] and cfg.get("custom_seasonality_name"):
         m.add_seasonality(
@@ -147,14 +568,88 @@ def _prophet_forecast(history: pd.DataFrame, horizon_days: int, conn) -> pd.Data
             period=cfg["custom_seasonality_period"],
             fourier_order=cfg["custom_seasonality_fourier_order"]
         )
+    return m
+
+
+def add_logistic_bounds(df: pd.DataFrame, history: pd.DataFrame, cfg: dict) -> pd.DataFrame:
+    """Add floor/cap columns (derived from the training history) for logistic growth."""
+    if cfg["growth"] != "logistic":
+        return df
+    df = df.copy()
+    df["floor"] = cfg["floor_multiplier"] * history["y"].min()
+    df["cap"] = cfg["cap_multiplier"] * history["y"].max()
+    return df
+
+
+def fit_prophet(history: pd.DataFrame, cfg: dict, init: dict = None) -> "Prophet":
+    """
+    Return a Prophet model fitted to history with the given preset settings.
+
+    Fitted models are cached by (history, preset) fingerprint, so repeated
+    calls with unchanged data and settings skip the Stan optimisation.
+    init optionally warm-starts the optimiser from a previous fit's
+    parameters (see warm_start_params); if Stan rejects them, e.g. because
+    the number of changepoints changed, the model is fitted cold instead.
+    """
+    key = MODEL_CACHE.key_for(history, cfg)
+    m = MODEL_CACHE.get(key)
+    if m is not None:
+        return m
+
+    train = add_logistic_bounds(history, history, cfg)
+    m = build_prophet(cfg)
+    with timed("prophet_fit", "warm" if init is not None else "cold"):
+        if init is not None:
+            try:
+                m.fit(train, init=init)
+            except Exception:
+                logging.info("Prophet warm start rejected; refitting cold")
+                m = build_prophet(cfg)
+                m.fit(train)
+        else:
+            m.fit(train)
+    MODEL_CACHE.put(key, m)
+    return m
+
+
+def warm_start_params(m: "Prophet") -> dict:
+    """Return a fitted model's MAP parameters in the form Prophet.fit(init=...) accepts."""
+    return {
+        "k": float(m.params["k"][0][0]),
+        "m": float(m.params["m"][0][0]),
+        "sigma_obs": float(m.params["sigma_obs"][0][0]),
+        "delta": m.params["delta"][0].tolist(),
+        "beta": m.params["beta"][0].tolist(),
+    }
+
+
+def _prophet_forecast(history: pd.DataFrame, horizon_days: int, conn, cfg: dict = None) -> pd.DataFrame:
+    """
+    Run Prophet forecast using settings from the database.
     
-    # Fit and predict
-    m.fit(history)
-    future = m.make_future_dataframe(periods=horizon_days, include_history=False)
+    Args:
+        history: DataFrame with columns 'ds' (datetime) and 'y' (float)
+        horizon_days: Number of days to forecast into the future
+        conn: Database connection (required)
+        cfg: Preset settings dict (default: the active preset is loaded from conn)
     
-    if cfg["growth"] == "logistic":
-        future["floor"] = cfg["floor_multiplier"] * history["y"].min()
-        future["cap"] = cfg["cap_multiplier"] * history["y"].max()
+    Returns:
+        DataFrame with columns: date, yhat, yhat_lower, yhat_upper
+    """
+    # Load active preset settings from database using prophet_settings functions
+    if cfg is None:
+        active_name = get_active_preset(conn)
+        cfg = get_preset(conn, active_name)
+    
+    # Fit (or reuse a cached fit) and predict
+    m = fit_prophet(history, cfg)
+    return _prophet_predict(m, history, horizon_days, cfg)
+
+
+def _prophet_predict(m: "Prophet", history: pd.DataFrame, horizon_days: int, cfg: dict) -> pd.DataFrame:
+    """Predict horizon_days past history with a fitted model, clamped to non-negative sales."""
+    future = m.make_future_dataframe(periods=horizon_days, include_history=False)
+    future = add_logistic_bounds(future, history, cfg)
     
     forecast = m.predict(future)
     
@@ -167,4 +662,3 @@ def _prophet_forecast(history: pd.DataFrame, horizon_days: int, conn) -> pd.Data
     return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].rename(
         columns={"ds": "date"}
     )
-
@@ -0,0 +1,98 @@
+"""
+In-process cache of fitted Prophet models.
+
+Models are keyed by a fingerprint of the training history plus the preset
+settings, so the same (data, preset) pair is only ever fitted once per
+worker process. Fitted models are stored serialized (Prophet's
+model_to_json) and evicted least-recently-used once the cache is full.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import PROPHET_MODEL_CACHE_SIZE
+from metrics import REGISTRY
+
+_LOOKUPS = REGISTRY.counter(
+    "pinkcafe_model_cache_lookups_total", "Fitted-model cache lookups by outcome.", ("result",),
+)
+_ENTRIES = REGISTRY.gauge("pinkcafe_model_cache_entries", "Fitted models held in the model cache.")
+
+# Preset fields that don't change the fitted model
+_NON_MODEL_PRESET_FIELDS = {"id", "preset_name", "created_at", "updated_at"}
+
+
+def preset_fingerprint(cfg: dict) -> str:
+    """Return a stable hash of the model-relevant settings in a preset dict."""
+    settings = {k: v for k, v in cfg.items() if k not in _NON_MODEL_PRESET_FIELDS}
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def history_fingerprint(history: pd.DataFrame) -> str:
+    """Return a stable hash of a (ds, y) training history."""
+    ds = pd.to_datetime(history["ds"]).values.astype("datetime64[ns]").astype(np.int64)
+    y = history["y"].to_numpy(dtype=np.float64)
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(ds).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()
+
+
+class ModelCache:
+    """Thread-safe LRU cache of serialized fitted Prophet models."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(history: pd.DataFrame, cfg: dict) -> str:
+        """Build the cache key for a training history and preset dict."""
+        return f"{history_fingerprint(history)}:{preset_fingerprint(cfg)}"
+
+    def get(self, key: str):
+        """Return a fresh fitted model for key, or None on a miss."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                _LOOKUPS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            _LOOKUPS.inc(result="hit")
+        from prophet.serialize import model_from_json
+        return model_from_json(payload)
+
+    def put(self, key: str, model) -> None:
+        """Serialize and store a fitted model, evicting the oldest entries if full."""
+        if self.max_entries == 0:
+            return
+        from prophet.serialize import model_to_json
+        payload = model_to_json(model)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared per-process cache used by forecasting.py and comparison.py
+MODEL_CACHE = ModelCache(PROPHET_MODEL_CACHE_SIZE)
+REGISTRY.add_collector(lambda: _ENTRIES.set(len(MODEL_CACHE)))
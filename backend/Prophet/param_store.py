@@ -0,0 +1,44 @@
+"""
+Store of fitted Prophet parameters, for warm-starting refits.
+
+After every forecast fit the MAP parameters (k, m, sigma_obs, delta, beta)
+are saved per (dataset, item, preset hash). When the item is forecast
+again on a longer or changed history, they initialise Stan via
+Prophet.fit(init=...), which usually lands near the new optimum. Unlike
+forecast_results, rows are kept when sales change - that is exactly when
+they are useful - and only dropped with the dataset or the preset.
+"""
+
+import json
+import sqlite3
+from typing import Optional
+
+
+def get_params(conn: sqlite3.Connection, dataset_id: int, item_id: int, preset_hash: str) -> Optional[dict]:
+    """Return the last fitted parameters for this item and preset, or None."""
+    row = conn.execute(
+        """
+        SELECT params FROM prophet_params
+        WHERE dataset_id = ? AND item_id = ? AND preset_hash = ?
+        """,
+        (dataset_id, item_id, preset_hash),
+    ).fetchone()
+    return json.loads(row["params"]) if row else None
+
+
+def save_params(conn: sqlite3.Connection, dataset_id: int, item_id: int, preset_name: str,
+                preset_hash: str, params: dict) -> None:
+    """Insert or replace the fitted parameters for this item and preset and commit."""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO prophet_params (dataset_id, item_id, preset_name, preset_hash, params)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (dataset_id, item_id, preset_name, preset_hash, json.dumps(params)),
+    )
+    conn.commit()
+
+
+def forget_preset_params(conn: sqlite3.Connection, preset_name: str) -> None:
+    """Drop parameters fitted with a preset (its settings changed or it was deleted)."""
+    conn.execute("DELETE FROM prophet_params WHERE preset_name = ?", (preset_name,))
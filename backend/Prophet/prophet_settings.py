@@ -9,6 +9,9 @@ import json
 import sqlite3
 
 from config import PROPHET_PRESET_DEFAULTS
+from result_store import invalidate_preset, invalidate_stale_presets
+from param_store import forget_preset_params
+from model_cache import preset_fingerprint
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -210,6 +213,10 @@ def update_preset(conn: sqlite3.Connection, preset_name: str, data: dict) -> dic
             "holidays":                         holidays_json,
         },
     )
+
+    # Results (and warm-start parameters) from the old settings are now stale
+    invalidate_preset(conn, preset_name)
+    forget_preset_params(conn, preset_name)
     conn.commit()
     return get_preset(conn, preset_name)
 
@@ -231,6 +238,8 @@ def delete_preset(conn: sqlite3.Connection, preset_name: str) -> None:
     conn.execute(
         "DELETE FROM prophet_presets WHERE preset_name = ?", (preset_name,)
     )
+    invalidate_preset(conn, preset_name)
+    forget_preset_params(conn, preset_name)
 
     # If the deleted preset was active, fall back to Default
     conn.execute(
@@ -269,5 +278,13 @@ def set_active_preset(conn: sqlite3.Connection, preset_name: str) -> str:
         "ON CONFLICT(id) DO UPDATE SET preset_name = excluded.preset_name",
         (preset_name,),
     )
+
+    # Results are keyed by preset hash, so other presets' results stay valid
+    # for when they are activated again; only drop ones that went stale
+    fingerprints = {
+        row["preset_name"]: preset_fingerprint(_row_to_dict(row))
+        for row in conn.execute("SELECT * FROM prophet_presets").fetchall()
+    }
+    invalidate_stale_presets(conn, fingerprints)
     conn.commit()
     return preset_name
@@ -0,0 +1,132 @@
+"""
+Persistent store for forecast and comparison results.
+
+Results are saved to the forecast_results table keyed by
+(kind, dataset_id, item_id, train_weeks, horizon, preset hash), so a
+repeated dashboard load is a single indexed read instead of a model fit.
+The invalidate_* helpers are called wherever the inputs change (append,
+dataset delete, preset update / activation) and leave committing to the
+caller. A new upload needs none: dataset ids are never reused.
+"""
+
+import json
+import sqlite3
+from typing import Optional
+
+from metrics import timed
+
+
+def _horizon_key(horizon) -> str:
+    """Encode a horizon (int or list of ints) so 4 and [4] are stored separately."""
+    return json.dumps(horizon)
+
+
+def get_result_json(conn: sqlite3.Connection, kind: str, dataset_id: int, item_id: int,
+                    train_weeks: int, horizon, preset_hash: str) -> Optional[str]:
+    """Return a stored result as its JSON text (not parsed), or None if nothing valid is stored."""
+    with timed("sql", "get_result"):
+        row = conn.execute(
+            """
+            SELECT result FROM forecast_results
+            WHERE kind = ? AND dataset_id = ? AND item_id = ? AND train_weeks = ?
+              AND horizon = ? AND preset_hash = ?
+            """,
+            (kind, dataset_id, item_id, train_weeks, _horizon_key(horizon), preset_hash),
+        ).fetchone()
+    return row["result"] if row else None
+
+
+def get_result_columns_json(conn: sqlite3.Connection, kind: str, dataset_id: int, item_id: int,
+                            train_weeks: int, horizon, preset_hash: str) -> Optional[tuple]:
+    """
+    Return (result JSON, columnar JSON or None if not saved yet) for a stored
+    result, or None if nothing valid is stored.
+    """
+    with timed("sql", "get_result"):
+        row = conn.execute(
+            """
+            SELECT result, result_columns FROM forecast_results
+            WHERE kind = ? AND dataset_id = ? AND item_id = ? AND train_weeks = ?
+              AND horizon = ? AND preset_hash = ?
+            """,
+            (kind, dataset_id, item_id, train_weeks, _horizon_key(horizon), preset_hash),
+        ).fetchone()
+    return (row["result"], row["result_columns"]) if row else None
+
+
+def get_result(conn: sqlite3.Connection, kind: str, dataset_id: int, item_id: int,
+               train_weeks: int, horizon, preset_hash: str) -> Optional[dict]:
+    """Return a stored result dict, or None if nothing valid is stored."""
+    text = get_result_json(conn, kind, dataset_id, item_id, train_weeks, horizon, preset_hash)
+    return json.loads(text) if text is not None else None
+
+
+def save_result(conn: sqlite3.Connection, kind: str, dataset_id: int, item_id: int,
+                train_weeks: int, horizon, preset_name: str, preset_hash: str,
+                result, columns: Optional[str] = None) -> None:
+    """
+    Insert or replace a stored result (a dict, or its JSON text) and commit.
+    columns is a forecast's columnar JSON text, if it has one.
+    """
+    with timed("sql", "save_result"):
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO forecast_results
+                (kind, dataset_id, item_id, train_weeks, horizon, preset_name, preset_hash,
+                 result, result_columns)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (kind, dataset_id, item_id, train_weeks, _horizon_key(horizon), preset_name, preset_hash,
+             result if isinstance(result, str) else json.dumps(result), columns),
+        )
+        conn.commit()
+
+
+def save_result_columns(conn: sqlite3.Connection, kind: str, dataset_id: int, item_id: int,
+                        train_weeks: int, horizon, preset_hash: str, columns: str) -> None:
+    """Add the columnar JSON text to an already stored result and commit."""
+    with timed("sql", "save_result"):
+        conn.execute(
+            """
+            UPDATE forecast_results SET result_columns = ?
+            WHERE kind = ? AND dataset_id = ? AND item_id = ? AND train_weeks = ?
+              AND horizon = ? AND preset_hash = ?
+            """,
+            (columns, kind, dataset_id, item_id, train_weeks, _horizon_key(horizon), preset_hash),
+        )
+        conn.commit()
+
+
+def invalidate_dataset(conn: sqlite3.Connection, dataset_id: int) -> None:
+    """Drop every stored result for a dataset (its sales rows changed)."""
+    conn.execute("DELETE FROM forecast_results WHERE dataset_id = ?", (dataset_id,))
+
+
+def invalidate_items(conn: sqlite3.Connection, dataset_id: int, item_ids) -> None:
+    """Drop the stored results of some of a dataset's items (their sales rows changed)."""
+    conn.executemany(
+        "DELETE FROM forecast_results WHERE dataset_id = ? AND item_id = ?",
+        [(dataset_id, int(item_id)) for item_id in item_ids],
+    )
+
+
+def invalidate_preset(conn: sqlite3.Connection, preset_name: str) -> None:
+    """Drop every stored result computed with a preset (its settings changed)."""
+    conn.execute("DELETE FROM forecast_results WHERE preset_name = ?", (preset_name,))
+
+
+def invalidate_stale_presets(conn: sqlite3.Connection, fingerprints: dict) -> None:
+    """
+    Drop results whose preset no longer exists or whose hash no longer matches
+    the preset's current fingerprint ({preset_name: fingerprint}). Results of
+    other, unchanged presets stay: they are keyed by their own hash.
+    """
+    rows = conn.execute("SELECT DISTINCT preset_name, preset_hash FROM forecast_results").fetchall()
+    # Non-Prophet results are keyed "<algorithm>:<fingerprint>" (see forecasting._result_hash)
+    stale = [
+        (name, result_hash) for name, result_hash in rows
+        if result_hash.rsplit(":", 1)[-1] != fingerprints.get(name)
+    ]
+    conn.executemany(
+        "DELETE FROM forecast_results WHERE preset_name = ? AND preset_hash = ?", stale,
+    )
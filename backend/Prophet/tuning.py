@@ -0,0 +1,251 @@
+"""
+Prophet hyperparameter search for Pink Cafe forecasting.
+
+Candidates are drawn (grid or random) from a search space over the preset
+columns in prophet_settings._PRESET_COLUMNS and scored by rolling-origin
+cross-validation MAE, reusing the fold machinery in comparison.py. They run
+in rounds of TUNING_WORKERS candidates across a process pool:
+
+  - a candidate stops fitting folds as soon as its summed fold MAE exceeds
+    the best complete candidate's total (it can no longer win), and
+  - the search stops after `patience` rounds without an improvement.
+
+The best configuration is saved as a new row in prophet_presets. run_tuning()
+is the entry point for 'tuning' jobs in jobs.py.
+"""
+
+import itertools
+import logging
+import math
+import random
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from config import COMPARISON_TIMEOUTS, TUNING_MAX_CANDIDATES, TUNING_WORKERS
+from executors import discard_process_pool, get_process_pool, is_main_process
+from forecasting import ForecastError, load_history
+from metrics import collect_stages, merge_stages
+from comparison import _prophet_fold, _rolling_folds
+from prophet_settings import _PRESET_COLUMNS, create_preset, get_active_preset, get_preset
+
+SEARCH_STRATEGIES = ("random", "grid")
+
+# Searched when the job doesn't supply its own space
+DEFAULT_SEARCH_SPACE = {
+    "changepoint_prior_scale": [0.001, 0.01, 0.05, 0.1, 0.15, 0.3, 0.5],
+    "seasonality_prior_scale": [0.01, 0.1, 1.0, 5.0, 10.0, 15.0],
+    "seasonality_mode": ["additive", "multiplicative"],
+    "changepoint_range": [0.8, 0.9, 0.95],
+    "n_changepoints": [10, 25],
+}
+
+# How each tunable preset column is coerced / checked. Columns that don't
+# change the point forecast (names, horizon, interval width, holidays) are
+# not tunable.
+_CHOICES = {
+    "growth": {"linear", "logistic", "flat"},
+    "seasonality_mode": {"additive", "multiplicative"},
+}
+_BOOL_COLUMNS = {
+    "daily_seasonality", "weekly_seasonality", "yearly_seasonality", "custom_seasonality_enabled",
+}
+_INT_COLUMNS = {"custom_seasonality_fourier_order", "n_changepoints"}
+_NOT_TUNABLE = {
+    "preset_name", "forecast_periods", "interval_width", "custom_seasonality_name", "holidays",
+}
+TUNABLE_COLUMNS = [c for c in _PRESET_COLUMNS if c not in _NOT_TUNABLE]
+
+
+def validate_space(space: dict) -> dict:
+    """
+    Check a search space {column: [values]} and return it with coerced values.
+    Raises ValueError for unknown columns, empty lists or bad values.
+    """
+    if not isinstance(space, dict) or not space:
+        raise ValueError("space must be a non-empty object of {column: [values]}")
+
+    clean = {}
+    for column, values in space.items():
+        if column not in TUNABLE_COLUMNS:
+            raise ValueError(f"'{column}' is not tunable; choose from: {', '.join(TUNABLE_COLUMNS)}")
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"space['{column}'] must be a non-empty list")
+        try:
+            if column in _CHOICES:
+                if any(v not in _CHOICES[column] for v in values):
+                    raise ValueError
+                coerced = list(values)
+            elif column in _BOOL_COLUMNS:
+                coerced = [bool(v) for v in values]
+            elif column in _INT_COLUMNS:
+                coerced = [int(v) for v in values]
+                if any(v < 0 for v in coerced):
+                    raise ValueError
+            else:
+                coerced = [float(v) for v in values]
+                if any(v <= 0 for v in coerced):
+                    raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError(f"space['{column}'] contains an invalid value")
+        # De-duplicate, keeping the given order
+        clean[column] = list(dict.fromkeys(coerced))
+    return clean
+
+
+def _candidates(space: dict, search: str, n_candidates: int, seed=None) -> list[dict]:
+    """Return the candidate parameter dicts for a grid or random search."""
+    columns = list(space)
+    sizes = [len(space[c]) for c in columns]
+    total = math.prod(sizes)
+
+    if search == "grid":
+        if total > TUNING_MAX_CANDIDATES:
+            raise ValueError(
+                f"Grid has {total} candidates (max {TUNING_MAX_CANDIDATES}); "
+                "narrow the space or use search='random'"
+            )
+        return [dict(zip(columns, combo)) for combo in itertools.product(*(space[c] for c in columns))]
+
+    # Random: sample grid positions without replacement, without building the grid
+    count = min(n_candidates, total, TUNING_MAX_CANDIDATES)
+    candidates = []
+    for index in random.Random(seed).sample(range(total), count):
+        params = {}
+        for column, size in zip(reversed(columns), reversed(sizes)):
+            index, position = divmod(index, size)
+            params[column] = space[column][position]
+        candidates.append({c: params[c] for c in columns})
+    return candidates
+
+
+def _score_candidate(history, bounds, cfg, prune_above=None):
+    """
+    Cross-validate one configuration and return {"mae", "total_mae", "fold_maes"}.
+
+    Folds are fitted in order with warm starts. If the running sum of fold
+    MAEs exceeds prune_above the candidate is abandoned ({"pruned": True}).
+    """
+    fold_maes = []
+    init = None
+    try:
+        for test_start, test_end in bounds:
+            metrics, init = _prophet_fold(history.iloc[:test_start], history.iloc[test_start:test_end], cfg, init)
+            fold_maes.append(metrics["mae"])
+            if prune_above is not None and sum(fold_maes) > prune_above:
+                return {"pruned": True, "fold_maes": fold_maes}
+    except Exception as e:
+        logging.info("Tuning candidate failed: %s", e)
+        return {"error": str(e), "fold_maes": fold_maes}
+
+    total = sum(fold_maes)
+    return {"mae": round(total / len(fold_maes), 2), "total_mae": total, "fold_maes": fold_maes}
+
+
+def _evaluate_round(history, bounds, configs, prune_above):
+    """Score a round of configurations, in parallel when a pool is available."""
+    if TUNING_WORKERS <= 1 or not is_main_process():
+        return [_score_candidate(history, bounds, cfg, prune_above) for cfg in configs]
+
+    pool = get_process_pool("tuning", TUNING_WORKERS)
+    timeout = COMPARISON_TIMEOUTS["prophet"] * len(bounds)
+    submitted = time.perf_counter()
+    futures = [pool.submit(collect_stages, _score_candidate, history, bounds, cfg, prune_above) for cfg in configs]
+
+    scores = []
+    timed_out = False
+    for future in futures:
+        remaining = max(0.0, submitted + timeout - time.perf_counter())
+        try:
+            scores.append(merge_stages(future.result(timeout=remaining)))
+        except FutureTimeoutError:
+            timed_out = True
+            scores.append({"error": f"Timed out after {timeout:g}s"})
+        except Exception as e:
+            logging.exception("Tuning candidate failed in pool")
+            scores.append({"error": str(e)})
+    if timed_out:
+        # A running fit can't be cancelled; kill it rather than let it hold a slot
+        discard_process_pool("tuning", pool)
+    return scores
+
+
+def run_tuning(conn, dataset_id, item_id, train_weeks=20, search="random", n_candidates=20,
+               space=None, folds=3, step_days=7, horizon_days=14, patience=3, seed=None,
+               preset_name=None, base_preset=None):
+    """
+    Search Prophet settings for one item and save the winner as a new preset.
+
+    Candidates override base_preset (default: the active preset) and are
+    scored against it by cross-validated MAE. If one beats the base preset it
+    is saved as preset_name (default 'Tuned <dataset>-<item> <timestamp>');
+    the active preset is left unchanged.
+    """
+    if search not in SEARCH_STRATEGIES:
+        raise ForecastError(f"search must be one of: {', '.join(SEARCH_STRATEGIES)}")
+    if patience < 1:
+        raise ForecastError("patience must be at least 1")
+
+    try:
+        base_name = base_preset or get_active_preset(conn)
+        base_cfg = get_preset(conn, base_name)
+        candidates = _candidates(validate_space(space or DEFAULT_SEARCH_SPACE), search, n_candidates, seed)
+    except ValueError as e:
+        raise ForecastError(str(e))
+
+    history = load_history(conn, dataset_id, item_id, train_weeks).reset_index(drop=True)
+    bounds = _rolling_folds(len(history), folds, step_days, horizon_days)
+
+    # The base preset is scored first so every candidate is judged against it
+    pending = [{}] + candidates
+    round_size = max(1, TUNING_WORKERS) if is_main_process() else 1
+    evaluated, best, best_total = [], None, None
+    rounds_without_improvement = 0
+    started = time.perf_counter()
+
+    while pending and rounds_without_improvement < patience:
+        batch, pending = pending[:round_size], pending[round_size:]
+        scores = _evaluate_round(history, bounds, [{**base_cfg, **params} for params in batch], best_total)
+
+        improved = False
+        for params, score in zip(batch, scores):
+            evaluated.append({"params": params, **score})
+            if "total_mae" in score and (best_total is None or score["total_mae"] < best_total):
+                best, best_total, improved = evaluated[-1], score["total_mae"], True
+        rounds_without_improvement = 0 if improved else rounds_without_improvement + 1
+
+    if best is None:
+        raise ForecastError("No candidate configuration could be fitted")
+
+    baseline = evaluated[0]
+    result = {
+        "success": True,
+        "dataset_id": dataset_id,
+        "item_id": item_id,
+        "train_weeks": train_weeks,
+        "search": search,
+        "folds": folds,
+        "base_preset": base_name,
+        "baseline_mae": baseline.get("mae"),
+        "best_mae": best["mae"],
+        "best_params": best["params"],
+        "improved": bool(best["params"]),
+        "preset_name": None,
+        "candidates_total": len(candidates),
+        "candidates_evaluated": len(evaluated) - 1,
+        "candidates_pruned": sum(1 for e in evaluated if e.get("pruned")),
+        "stopped_early": bool(pending),
+        "wall_time_ms": round((time.perf_counter() - started) * 1000, 1),
+        "leaderboard": sorted(
+            (e for e in evaluated if "mae" in e), key=lambda e: e["total_mae"]
+        )[:5],
+    }
+
+    if result["improved"]:
+        name = preset_name or f"Tuned {dataset_id}-{item_id} {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        try:
+            create_preset(conn, {**base_cfg, **best["params"], "preset_name": name})
+        except ValueError as e:
+            raise ForecastError(str(e))
+        result["preset_name"] = name
+    return result
@@ -9,7 +9,11 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from db import init_db
+from jobs import resume_pending_jobs
+from sessions import start_session_sweeper
 from routes import register_routes
+from metrics import install_request_metrics, timed
+from compression import install_compression
 
 # --- Configuration (read from environment, with sensible defaults) ---
 DEBUG        = os.getenv("FLASK_ENV", "development") == "development"
@@ -27,10 +31,23 @@ def create_app() -> Flask:
     CORS(app, origins=CORS_ORIGINS)
 
     # Create DB tables if they don't exist yet (safe to run every startup)
-    init_db(DATABASE_PATH)
+    with timed("startup", "init_db"):
+        init_db(DATABASE_PATH)
 
-    # Attach all API routes
-    register_routes(app)
+    # Pick up forecast jobs that were queued before the last restart
+    with timed("startup", "resume_pending_jobs"):
+        resume_pending_jobs(DATABASE_PATH)
+
+    # Periodically delete expired session tokens
+    start_session_sweeper(DATABASE_PATH)
+
+    # Attach all API routes, timing each request (see metrics.py)
+    with timed("startup", "register_routes"):
+        register_routes(app)
+    install_request_metrics(app)
+
+    # gzip / brotli JSON and NDJSON replies for clients that accept it
+    install_compression(app)
 
     # Security: add OWASP-recommended response headers to every reply
     @app.after_request
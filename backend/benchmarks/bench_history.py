@@ -0,0 +1,133 @@
+"""
+Benchmark: forecasting history loaders, row-dict build vs columnar.
+
+Compares the original loaders (fetch every sqlite3.Row, build the frame
+from a list of dicts / per-row lists, trim to train_weeks in pandas)
+against forecasting.load_history / load_dataset_histories, which trim in
+SQL and build the frame from column arrays in one vectorized pass.
+
+The synthetic dataset has --items items with rows/items days each, so
+'single item' loads one item's full date range and 'whole dataset' loads
+every row of the dataset.
+
+Usage (from backend/):
+    python benchmarks/bench_history.py [--rows 10000 100000 1000000] [--items 100]
+                                       [--train-weeks 52] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Prophet"))
+
+from db import SCHEMA_SQL, connect
+from forecasting import ForecastError, load_dataset_histories, load_history
+
+
+def _legacy_trim(history, train_weeks):
+    cutoff_date = history["ds"].max() - pd.Timedelta(weeks=train_weeks)
+    history = history[history["ds"] >= cutoff_date].copy()
+    if len(history) < 7:
+        raise ForecastError(f"Insufficient data: only {len(history)} days available for training")
+    return history
+
+
+def _legacy_load_history(conn, dataset_id, item_id, train_weeks):
+    """The pre-columnar load_history, kept here for comparison."""
+    rows = conn.execute(
+        "SELECT day, quantity FROM sales WHERE dataset_id = ? AND item_id = ? ORDER BY day",
+        (dataset_id, item_id),
+    ).fetchall()
+    history = pd.DataFrame([
+        {"ds": pd.to_datetime(row["day"], unit="D"), "y": float(row["quantity"])}
+        for row in rows
+    ])
+    return _legacy_trim(history, train_weeks)
+
+
+def _legacy_load_dataset_histories(conn, dataset_id, train_weeks):
+    """The pre-columnar load_dataset_histories, kept here for comparison."""
+    rows = conn.execute(
+        "SELECT item_id, day, quantity FROM sales WHERE dataset_id = ? ORDER BY day",
+        (dataset_id,),
+    ).fetchall()
+    frame = pd.DataFrame({
+        "item_id": [int(row["item_id"]) for row in rows],
+        "ds": pd.to_datetime([row["day"] for row in rows], unit="D"),
+        "y": [float(row["quantity"]) for row in rows],
+    })
+    histories = {}
+    for item_id, group in frame.groupby("item_id", sort=True):
+        try:
+            histories[int(item_id)] = _legacy_trim(group[["ds", "y"]].reset_index(drop=True), train_weeks)
+        except ForecastError as e:
+            histories[int(item_id)] = e
+    return histories
+
+
+def _build_db(db_path, rows, items):
+    days = max(7, rows // items)
+    rng = np.random.default_rng(0)
+    day_numbers = np.arange(days) + (pd.Timestamp("1990-01-01") - pd.Timestamp(0)).days
+    with connect(db_path) as conn:
+        conn.executescript(SCHEMA_SQL)
+        dataset_id = conn.execute("INSERT INTO datasets (name) VALUES ('bench')").lastrowid
+        conn.executemany(
+            "INSERT INTO items (name, category) VALUES (?, 'food')",
+            [(f"Product {i}",) for i in range(1, items + 1)],
+        )
+        for item_id in range(1, items + 1):
+            quantities = rng.integers(0, 200, size=days).tolist()
+            conn.executemany(
+                "INSERT INTO sales (dataset_id, item_id, day, quantity) VALUES (?, ?, ?, ?)",
+                zip([dataset_id] * days, [item_id] * days, day_numbers.tolist(), quantities),
+            )
+        conn.commit()
+    return dataset_id, days
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--train-weeks", type=int, default=52)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            dataset_id, days = _build_db(db_path, rows, args.items)
+            print(f"{args.items} items x {days:,} days = {args.items * days:,} sales rows, "
+                  f"train_weeks={args.train_weeks} (best of {args.repeat})")
+
+            with connect(db_path) as conn:
+                cases = (
+                    ("single item, row dicts", lambda: _legacy_load_history(conn, dataset_id, 1, args.train_weeks)),
+                    ("single item, columnar", lambda: load_history(conn, dataset_id, 1, args.train_weeks)),
+                    ("whole dataset, row lists", lambda: _legacy_load_dataset_histories(conn, dataset_id, args.train_weeks)),
+                    ("whole dataset, columnar", lambda: load_dataset_histories(conn, dataset_id, args.train_weeks)),
+                )
+                for label, fn in cases:
+                    elapsed = _best(fn, args.repeat)
+                    print(f"  {label:<26} {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
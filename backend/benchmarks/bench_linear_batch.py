@@ -0,0 +1,79 @@
+"""
+Benchmark: linear_regression engine, one fit per item vs one batched fit.
+
+Fits the linear trend + day-of-week model to --items synthetic item
+histories of --days days each, either item by item (sklearn
+LinearRegression, as the backtests used to, and the engine's own fit()) or
+for every item at once with LinearRegressionEngine.fit_batch(). Only the
+fit is timed; predicting and formatting each item's forecast costs the
+same either way.
+
+Usage (from backend/):
+    python benchmarks/bench_linear_batch.py [--items 10 100 1000] [--days 364] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Prophet"))
+
+from engines import LinearRegressionEngine
+
+
+def _sklearn_fit(history):
+    """The per-item sklearn fit the linear backtest used, kept here for comparison."""
+    ds = pd.to_datetime(history["ds"])
+    day_index = (ds - ds.min()).dt.days.to_numpy().reshape(-1, 1)
+    X = np.hstack([day_index, pd.get_dummies(ds.dt.dayofweek, dtype=float).to_numpy()])
+    return LinearRegression().fit(X, history["y"].to_numpy())
+
+
+def _histories(items, days):
+    rng = np.random.default_rng(0)
+    ds = pd.date_range("2024-01-01", periods=days, freq="D")
+    return {
+        item_id: pd.DataFrame({"ds": ds, "y": rng.integers(0, 200, size=days).astype(float)})
+        for item_id in range(1, items + 1)
+    }
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--days", type=int, default=364)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cfg = {"interval_width": 0.8}
+    for items in args.items:
+        histories = _histories(items, args.days)
+        print(f"{items} items x {args.days} days (best of {args.repeat})")
+
+        cases = (
+            ("per item, sklearn", lambda: [_sklearn_fit(h) for h in histories.values()]),
+            ("per item, engine.fit", lambda: [LinearRegressionEngine().fit(h, cfg) for h in histories.values()]),
+            ("batched, fit_batch", lambda: LinearRegressionEngine.fit_batch(histories, cfg)),
+        )
+        for label, fn in cases:
+            elapsed = _best(fn, args.repeat)
+            print(f"  {label:<22} {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: CSV upload sales insert, row-by-row vs vectorized.
+
+Compares the original upload_csv loop (df.iterrows() + one INSERT per
+cell, plus an INSERT OR IGNORE / SELECT per product) against
+ingest.ensure_items + ingest.insert_sales on a synthetic wide frame.
+
+Usage (from backend/):
+    python benchmarks/bench_upload.py [--days 365] [--products 20] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from db import SCHEMA_SQL, connect
+from ingest import categorize_item, ensure_items, insert_sales
+
+
+def _synthetic_frame(days: int, products: int) -> tuple[pd.DataFrame, list[str]]:
+    rng = np.random.default_rng(0)
+    product_cols = [f"Product {i}" for i in range(1, products + 1)]
+    df = pd.DataFrame(rng.integers(0, 200, size=(days, products)).astype(float), columns=product_cols)
+    df.insert(0, "Date", pd.date_range("2024-01-01", periods=days, freq="D"))
+    return df, product_cols
+
+
+def _legacy_insert(conn, dataset_id, df, product_cols):
+    """The pre-vectorization upload_csv insert path, kept here for comparison."""
+    item_ids = {}
+    for col in product_cols:
+        conn.execute("INSERT OR IGNORE INTO items (name, category) VALUES (?, ?)", (col, categorize_item(col)))
+        item_ids[col] = conn.execute("SELECT id FROM items WHERE name = ?", (col,)).fetchone()["id"]
+
+    for _, row in df.iterrows():
+        day = (row["Date"] - pd.Timestamp(0)).days
+        for col in product_cols:
+            quantity = int(row[col]) if pd.notna(row[col]) else 0
+            conn.execute(
+                "INSERT INTO sales (dataset_id, item_id, day, quantity) VALUES (?, ?, ?, ?)",
+                (dataset_id, item_ids[col], day, quantity),
+            )
+
+
+def _vectorized_insert(conn, dataset_id, df, product_cols):
+    item_ids = ensure_items(conn, product_cols)
+    insert_sales(conn, dataset_id, df[["Date"] + product_cols], item_ids)
+
+
+def _time(insert_fn, df, product_cols, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            with connect(db_path) as conn:
+                conn.executescript(SCHEMA_SQL)
+                dataset_id = conn.execute("INSERT INTO datasets (name) VALUES ('bench')").lastrowid
+                start = time.perf_counter()
+                insert_fn(conn, dataset_id, df, product_cols)
+                conn.commit()
+                best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df, product_cols = _synthetic_frame(args.days, args.products)
+    rows = args.days * args.products
+    print(f"{args.days} days x {args.products} products = {rows:,} sales rows (best of {args.repeat})")
+
+    for label, fn in (("row-by-row", _legacy_insert), ("vectorized", _vectorized_insert)):
+        elapsed = _time(fn, df, product_cols, args.repeat)
+        print(f"  {label:<11} {elapsed * 1000:9.1f} ms  {rows / elapsed:12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
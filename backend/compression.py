@@ -0,0 +1,108 @@
+"""
+gzip / brotli compression of API responses.
+
+install_compression() adds an after_request hook that compresses JSON,
+NDJSON and MessagePack replies for clients that send a matching
+Accept-Encoding header:
+
+- buffered responses of at least COMPRESS_MIN_BYTES are compressed in one
+  go, with brotli when the client accepts it, else gzip
+- streamed responses (the NDJSON endpoints) are gzipped chunk by chunk,
+  flushing after each chunk so a line still reaches the client as soon as
+  it is produced
+
+Responses that already carry a Content-Encoding, file downloads and
+bodiless statuses are passed through untouched. RESPONSE_COMPRESSION=0
+turns the hook off, e.g. behind a proxy that compresses on its own.
+"""
+
+import gzip
+import zlib
+
+import brotli
+from flask import request
+
+from config import COMPRESS_MIN_BYTES, RESPONSE_COMPRESSION
+from metrics import timed
+
+# Levels that suit dynamic responses: most of the size win at a fraction of
+# the CPU of the maximum settings
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+_COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/x-msgpack",
+}
+
+
+def install_compression(app) -> None:
+    """Compress eligible responses of this app (no-op if RESPONSE_COMPRESSION=0)."""
+    if not RESPONSE_COMPRESSION:
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        encoding = _response_encoding(response)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            # gzip's sync flush keeps every chunk decodable on arrival
+            response.response = _gzip_stream(response.iter_encoded(), response.response)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESS_MIN_BYTES:
+                return response
+            with timed("serialize", encoding):
+                if encoding == "br":
+                    data = brotli.compress(data, quality=_BROTLI_QUALITY)
+                else:
+                    data = gzip.compress(data, compresslevel=_GZIP_LEVEL, mtime=0)
+            response.set_data(data)
+
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype in _COMPRESSIBLE_MIMETYPES or mimetype.endswith("+json")
+
+
+def _response_encoding(response):
+    """'br', 'gzip' or None: how (and whether) to compress this response."""
+    if (
+        request.method == "HEAD"
+        or response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or not _compressible(response.mimetype or "")
+    ):
+        return None
+    accepted = request.accept_encodings
+    # Streams are always gzipped (see _gzip_stream)
+    if not response.is_streamed and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _gzip_stream(chunks, body):
+    """gzip the byte chunks of a streamed body, flushing after each one."""
+    compressor = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Closing this generator (client gone) must still close the original
+        # body, e.g. to end a stream_with_context request context
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
@@ -1,5 +1,7 @@
 """Shared backend configuration values."""
 
+import os
+
 PROPHET_PRESET_DEFAULTS = {
     "growth": "linear",
     "changepoint_prior_scale": 0.15,
@@ -21,3 +23,94 @@ PROPHET_PRESET_DEFAULTS = {
     "holidays_prior_scale": 10.0,
     "holidays": [],
 }
+
+# Max fitted Prophet models kept in memory per worker process (0 disables caching)
+PROPHET_MODEL_CACHE_SIZE = int(os.getenv("PROPHET_MODEL_CACHE_SIZE", "64"))
+
+# Process pools (executors.py). Each gunicorn worker has its own four pools,
+# and every pool process imports pandas / Prophet (~100 MB), so the pool sizes
+# bound memory, not just CPU. At most
+#   FORECAST_JOB_WORKERS + COMPARISON_WORKERS + FORECAST_WORKERS + TUNING_WORKERS
+# processes per gunicorn worker (2 + 3 + 2 + 2 = 9 by default, 18 with the
+# Dockerfile's 2 workers), started on first use. Raise them on hosts with
+# the memory to spare.
+
+# Processes per gunicorn worker that run queued forecast jobs (see jobs.py)
+FORECAST_JOB_WORKERS = int(os.getenv("FORECAST_JOB_WORKERS", "2"))
+
+# Processes used to run the Prophet / SARIMA / Linear Regression backtests of
+# one comparison concurrently (1 runs them one after another in-process)
+COMPARISON_WORKERS = int(os.getenv("COMPARISON_WORKERS", "3"))
+
+# Per-algorithm backtest timeouts in seconds (only enforced when running in parallel)
+COMPARISON_TIMEOUTS = {
+    "prophet":           float(os.getenv("COMPARISON_TIMEOUT_PROPHET", "60")),
+    "sarima":            float(os.getenv("COMPARISON_TIMEOUT_SARIMA", "60")),
+    "linear_regression": float(os.getenv("COMPARISON_TIMEOUT_LINREG", "15")),
+}
+
+# Processes used to fit items in parallel for a whole-dataset forecast
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "2"))
+
+# CSV uploads larger than this are ingested in chunks (see ingest.ingest_csv_stream);
+# ?mode=stream / ?mode=memory on the upload request overrides the choice
+UPLOAD_STREAM_THRESHOLD_BYTES = int(float(os.getenv("UPLOAD_STREAM_THRESHOLD_MB", "20")) * 1024 * 1024)
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "5000"))
+
+# SQLite: idle connections kept per thread by db.connect, and per-connection
+# page cache / memory-map sizes
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+# Session tokens: lifetime, in-process cache of validated tokens (logouts in
+# other workers reach it through the session_revocations table), and how often
+# expired rows are swept from the sessions table (0 disables)
+SESSION_LIFETIME_HOURS = int(os.getenv("SESSION_LIFETIME_HOURS", "24"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "3600"))
+
+# Password hashing: bcrypt cost factor (each +1 doubles the work), threads
+# dedicated to bcrypt, and how many hashes may be queued or running before
+# new logins wait up to PASSWORD_HASH_TIMEOUT seconds and then get a 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
+# Hyperparameter tuning jobs (Prophet/tuning.py): processes scoring candidates
+# in parallel, and the most candidates a single search may evaluate
+TUNING_WORKERS = int(os.getenv("TUNING_WORKERS", "2"))
+TUNING_MAX_CANDIDATES = int(os.getenv("TUNING_MAX_CANDIDATES", "100"))
+
+# Import Prophet / statsmodels in each gunicorn worker as soon as it forks
+# (see gunicorn.conf.py) instead of on its first forecast. Off by default so
+# workers that only serve auth and uploads stay small.
+PREWARM_MODELS = os.getenv("PREWARM_MODELS", "0") == "1"
+
+# Per-request profiling (metrics.py): when enabled, a request sent with
+# ?profile=1 or an "X-Profile: 1" header runs under cProfile, and if it took
+# at least PROFILE_MIN_MS its stats are written to PROFILE_DIR
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_MIN_MS = float(os.getenv("PROFILE_MIN_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+
+# GET /api/metrics needs a logged-in user's bearer token. Set METRICS_TOKEN to
+# also let a Prometheus scraper in with "Authorization: Bearer <METRICS_TOKEN>"
+# (unset by default, so no fixed token is accepted).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Sales history storage read by the forecasting code (see sales_store.py):
+# 'columnar' memory-maps a per-dataset .npy copy of the sales table and falls
+# back to SQL when a dataset has none; 'sqlite' always queries the sales
+# table. SALES_STORE_DIR defaults to a sales_columns/ directory next to the
+# database file.
+SALES_STORE = os.getenv("SALES_STORE", "columnar")
+SALES_STORE_DIR = os.getenv("SALES_STORE_DIR", "")
+
+# gzip / brotli compression of API responses (see compression.py): buffered
+# responses smaller than COMPRESS_MIN_BYTES are sent as they are. Turn it off
+# when a reverse proxy already compresses.
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") == "1"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
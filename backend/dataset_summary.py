@@ -0,0 +1,122 @@
+"""
+Pre-aggregated per-dataset summaries for the Pink Cafe backend.
+
+One dataset_summary row per dataset holds what the dataset listing shows
+(date span, row count, products with their item ids and avg/min/max), so
+/api/upload/datasets is a single indexed query instead of scanning sales
+for every dataset. Rows are written at upload time and removed with the
+dataset by the foreign-key cascade.
+
+save_summary() / refresh_summary() are called from routes.py;
+backfill_summaries() is called once on startup from db.init_db.
+"""
+
+import json
+import sqlite3
+
+from metrics import timed
+
+
+def save_summary(conn: sqlite3.Connection, dataset_id: int, start_date, end_date,
+                 row_count: int, item_ids: dict, stats: dict) -> None:
+    """
+    Store the summary of a freshly ingested dataset. Does not commit.
+
+    start_date / end_date are datetimes (or ISO date strings); stats is the
+    {product: {'avg', 'min', 'max'}} dict upload_csv reports.
+    """
+    items = [
+        {"item_id": int(item_ids[name]), "name": name, **stats[name]}
+        for name in sorted(item_ids)
+    ]
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO dataset_summary (dataset_id, start_date, end_date, row_count, items)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (dataset_id, _iso(start_date), _iso(end_date), int(row_count), json.dumps(items)),
+    )
+
+
+def refresh_summary(conn: sqlite3.Connection, dataset_id: int) -> None:
+    """Recompute a dataset's summary from its sales rows. Does not commit."""
+    # Grouping by item_id alone follows the sales primary key, so the
+    # aggregate needs no temporary B-tree; item names are joined afterwards
+    with timed("sql", "refresh_summary"):
+        item_rows = conn.execute(
+            """
+            SELECT s.item_id, i.name AS name, s.avg, s.min, s.max,
+                   date(s.first_day + 2440587.5) AS start_date, date(s.last_day + 2440587.5) AS end_date,
+                   s.days
+            FROM (
+              SELECT item_id, AVG(quantity) AS avg, MIN(quantity) AS min, MAX(quantity) AS max,
+                     MIN(day) AS first_day, MAX(day) AS last_day, COUNT(*) AS days
+              FROM sales
+              WHERE dataset_id = ?
+              GROUP BY item_id
+            ) s
+            JOIN items i ON i.id = s.item_id
+            """,
+            (dataset_id,),
+        ).fetchall()
+
+    if not item_rows:
+        save_summary(conn, dataset_id, None, None, 0, {}, {})
+        return
+
+    save_summary(
+        conn,
+        dataset_id,
+        min(row["start_date"] for row in item_rows),
+        max(row["end_date"] for row in item_rows),
+        max(row["days"] for row in item_rows),
+        {row["name"]: row["item_id"] for row in item_rows},
+        {
+            row["name"]: {"avg": round(float(row["avg"]), 1), "min": int(row["min"]), "max": int(row["max"])}
+            for row in item_rows
+        },
+    )
+
+
+def backfill_summaries(conn: sqlite3.Connection) -> int:
+    """Create summaries for datasets uploaded before the table existed. Does not commit."""
+    missing = conn.execute(
+        """
+        SELECT d.id FROM datasets d
+        LEFT JOIN dataset_summary ds ON ds.dataset_id = d.id
+        WHERE ds.dataset_id IS NULL
+        """
+    ).fetchall()
+    for row in missing:
+        refresh_summary(conn, int(row["id"]))
+    return len(missing)
+
+
+def list_summaries(conn: sqlite3.Connection, user_id: int) -> list[dict]:
+    """Return every dataset owned by user_id with its summary, newest first."""
+    with timed("sql", "list_summaries"):
+        rows = conn.execute(
+            """
+            SELECT d.id, d.name, d.source_filename, d.uploaded_at,
+                   ds.start_date, ds.end_date, ds.row_count, ds.items
+            FROM datasets d
+            LEFT JOIN dataset_summary ds ON ds.dataset_id = d.id
+            WHERE d.uploaded_by_user_id = ?
+            ORDER BY d.uploaded_at DESC, d.id DESC
+            """,
+            (user_id,),
+        ).fetchall()
+
+    summaries = []
+    for row in rows:
+        summary = dict(row)
+        summary["items"] = json.loads(row["items"]) if row["items"] else []
+        summaries.append(summary)
+    return summaries
+
+
+def _iso(value):
+    """Normalise a date-like value to 'YYYY-MM-DD' (None stays None)."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d")
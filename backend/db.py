@@ -2,19 +2,42 @@
 Database helpers for the Pink Cafe backend.
 
 Uses SQLite via the standard library - no ORM needed.
-connect() is used throughout routes.py to get a DB connection.
-init_db() is called once on startup from app.py.
+connect() is used throughout routes.py to get a DB connection; connections
+are pooled per thread and tuned once when opened (see _open_connection).
+init_db() is called once on startup from app.py; it also migrates databases
+created by older versions (PRAGMA user_version < SCHEMA_VERSION).
 """
 
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 import os
 
-from config import PROPHET_PRESET_DEFAULTS
+from config import (
+    PROPHET_PRESET_DEFAULTS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_POOL_SIZE,
+)
 
 # --- Schema ---
+# Stored in PRAGMA user_version; bump it when adding a migration to init_db
+SCHEMA_VERSION = 2
+
+_SALES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {name} (
+  dataset_id INTEGER NOT NULL,
+  item_id    INTEGER NOT NULL,
+  day        INTEGER NOT NULL,
+  quantity   INTEGER NOT NULL CHECK (quantity >= 0),
+  PRIMARY KEY (dataset_id, item_id, day),
+  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE,
+  FOREIGN KEY (item_id)    REFERENCES items(id)    ON DELETE CASCADE
+) WITHOUT ROWID;
+"""
+
 SCHEMA_SQL = f"""
 PRAGMA foreign_keys = ON;
 
@@ -42,18 +65,12 @@ CREATE TABLE IF NOT EXISTS items (
   category TEXT NOT NULL CHECK (category IN ('coffee', 'food'))
 );
 
-CREATE TABLE IF NOT EXISTS sales (
-  id         INTEGER PRIMARY KEY AUTOINCREMENT,
-  dataset_id INTEGER NOT NULL,
-  date       TEXT NOT NULL,
-  item_id    INTEGER NOT NULL,
-  quantity   INTEGER NOT NULL CHECK (quantity >= 0),
-  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE,
-  FOREIGN KEY (item_id)    REFERENCES items(id)    ON DELETE CASCADE
-);
-
-CREATE INDEX IF NOT EXISTS idx_sales_dataset_date ON sales(dataset_id, date);
-CREATE INDEX IF NOT EXISTS idx_sales_item_date    ON sales(item_id, date);
+-- One row per dataset, item and day. day is a day number (days since
+-- 1970-01-01; date(day + 2440587.5) in SQL gives the ISO date). WITHOUT
+-- ROWID stores the rows in primary-key order, so an item's history is a
+-- contiguous range of pages. No secondary index: the planner would pick an
+-- index on item_id (which carries the key columns) over the clustered key.
+{_SALES_TABLE_SQL.format(name='sales')}
 
 -- Prophet preset tables
 CREATE TABLE IF NOT EXISTS prophet_presets (
@@ -88,6 +105,87 @@ CREATE TABLE IF NOT EXISTS active_preset (
   preset_name TEXT NOT NULL DEFAULT 'Default'
 );
 
+-- Stored run_forecast / run_comparison outputs. Rows are invalidated when the
+-- dataset is appended to or deleted, or when the preset they used changes.
+-- result_columns holds a forecast's columnar form (?format=columns); it is
+-- NULL for comparisons and filled in on first use for older forecasts.
+CREATE TABLE IF NOT EXISTS forecast_results (
+  id          INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind        TEXT    NOT NULL CHECK (kind IN ('forecast', 'comparison')),
+  dataset_id  INTEGER NOT NULL,
+  item_id     INTEGER NOT NULL,
+  train_weeks INTEGER NOT NULL,
+  horizon     TEXT    NOT NULL,
+  preset_name TEXT    NOT NULL,
+  preset_hash TEXT    NOT NULL,
+  result      TEXT    NOT NULL,
+  result_columns TEXT,
+  created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (kind, dataset_id, item_id, train_weeks, horizon, preset_hash),
+  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_forecast_results_preset ON forecast_results(preset_name);
+
+-- Last fitted Prophet parameters per item and preset, used to warm-start
+-- refits (see Prophet/param_store.py). Kept when sales change.
+CREATE TABLE IF NOT EXISTS prophet_params (
+  dataset_id  INTEGER NOT NULL,
+  item_id     INTEGER NOT NULL,
+  preset_name TEXT    NOT NULL,
+  preset_hash TEXT    NOT NULL,
+  params      TEXT    NOT NULL,
+  updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (dataset_id, item_id, preset_hash),
+  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+-- Background forecast / comparison jobs (see jobs.py). worker_pid is the
+-- gunicorn worker that owns a running job, so restarts can requeue it.
+CREATE TABLE IF NOT EXISTS forecast_jobs (
+  id          TEXT PRIMARY KEY,
+  user_id     INTEGER NOT NULL,
+  kind        TEXT    NOT NULL,
+  params      TEXT    NOT NULL,
+  status      TEXT    NOT NULL DEFAULT 'queued'
+              CHECK (status IN ('queued', 'running', 'done', 'failed')),
+  result      TEXT,
+  error       TEXT,
+  worker_pid  INTEGER,
+  created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  started_at  TIMESTAMP,
+  finished_at TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_forecast_jobs_status ON forecast_jobs(status, created_at);
+
+-- Per-dataset listing summary, written at upload (see dataset_summary.py).
+-- items is a JSON list of {{item_id, name, avg, min, max}} sorted by name.
+CREATE TABLE IF NOT EXISTS dataset_summary (
+  dataset_id INTEGER PRIMARY KEY,
+  start_date TEXT,
+  end_date   TEXT,
+  row_count  INTEGER NOT NULL DEFAULT 0,
+  items      TEXT    NOT NULL DEFAULT '[]',
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_datasets_owner ON datasets(uploaded_by_user_id, uploaded_at);
+
+-- Where each item's history lives in its dataset's columnar .npy file: rows
+-- [start, stop) of the file (see sales_store.py). Rebuilt from sales.
+CREATE TABLE IF NOT EXISTS sales_columns (
+  dataset_id INTEGER NOT NULL,
+  item_id    INTEGER NOT NULL,
+  file       TEXT    NOT NULL,
+  start      INTEGER NOT NULL,
+  stop       INTEGER NOT NULL,
+  PRIMARY KEY (dataset_id, item_id),
+  FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
 -- Auth session tokens (one row per active login)
 CREATE TABLE IF NOT EXISTS sessions (
   token      TEXT PRIMARY KEY,
@@ -96,29 +194,189 @@ CREATE TABLE IF NOT EXISTS sessions (
   expires_at TIMESTAMP NOT NULL,
   FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
+
+-- Log of logouts, read by every worker to drop revoked tokens from its
+-- session cache (see sessions.py). Rows only matter for one cache TTL.
+CREATE TABLE IF NOT EXISTS session_revocations (
+  id         INTEGER PRIMARY KEY AUTOINCREMENT,
+  token      TEXT NOT NULL,
+  revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 """
 
 
+# Idle connections, per thread and per database path. sqlite3 connections
+# can't be shared between threads, so each thread keeps its own small pool.
+_pool = threading.local()
+_prepared_dirs: set = set()
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Open and tune a new connection; pragmas are applied once per connection."""
+    if db_path not in _prepared_dirs:
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        _prepared_dirs.add(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row          # rows behave like dicts
+    conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL lets readers run while an upload is writing; NORMAL is durable in WAL mode
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024};")
+    return conn
+
+
+def _idle_connections(db_path: str) -> list:
+    """Return this thread's idle connections for db_path (dropped after a fork)."""
+    if getattr(_pool, "pid", None) != os.getpid():
+        _pool.pid = os.getpid()
+        _pool.idle = {}
+    return _pool.idle.setdefault(db_path, [])
+
+
 @contextmanager
 def connect(db_path: str) -> Iterator[sqlite3.Connection]:
-    """Open a SQLite connection with foreign keys enabled, yield it, then close it."""
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    """
+    Yield a pooled SQLite connection with foreign keys enabled.
+
+    Behaves like a fresh connection: anything left uncommitted is rolled
+    back when the block exits. Nested connect() calls get separate
+    connections, exactly as before pooling.
+    """
+    idle = _idle_connections(db_path)
+    conn = idle.pop() if idle else _open_connection(db_path)
+    reusable = False
     try:
-        conn.row_factory = sqlite3.Row          # rows behave like dicts
-        conn.execute("PRAGMA foreign_keys = ON;")
         yield conn
+        reusable = True
     finally:
-        conn.close()
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            reusable = False
+        if reusable and len(idle) < SQLITE_POOL_SIZE:
+            idle.append(conn)
+        else:
+            conn.close()
+
+
+# Rows copied per write transaction by the sales day-number migration
+_MIGRATION_BATCH_ROWS = 50_000
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _has_legacy_sales(conn: sqlite3.Connection) -> bool:
+    """True while sales is still the old rowid table with TEXT dates."""
+    return any(row["name"] == "date" for row in conn.execute("PRAGMA table_info(sales)"))
+
+
+def _migrate_sales_day_numbers(conn: sqlite3.Connection) -> None:
+    """
+    Migrate a sales table with 'YYYY-MM-DD' dates to the day-number,
+    WITHOUT ROWID layout, online.
+
+    Rows are copied into sales_new in batches of _MIGRATION_BATCH_ROWS, in
+    id order and each in its own short write transaction, so other workers
+    keep reading and uploading to the old table meanwhile. Rows committed
+    while the copy runs get higher ids and are picked up by later batches;
+    deleted datasets cascade to sales_new as well. The last step holds the
+    write lock only to swap the tables. Progress is kept in sales_migration,
+    so several processes can run this at once (they take turns) and an
+    interrupted migration resumes where it stopped.
+
+    Duplicate rows for the same dataset, item and date are summed; column
+    files of datasets that had any are dropped so they are re-exported.
+    """
+    if not _table_exists(conn, "sales") or not _has_legacy_sales(conn):
+        return
+    conn.executescript(
+        _SALES_TABLE_SQL.format(name="sales_new")
+        + "CREATE TABLE IF NOT EXISTS sales_migration (copied_through INTEGER NOT NULL);"
+    )
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        if not _has_legacy_sales(conn):
+            # Another process finished the migration while we waited for the lock
+            conn.rollback()
+            return
+        progress = conn.execute("SELECT copied_through FROM sales_migration").fetchone()
+        copied_through = progress[0] if progress else 0
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]
+        if copied_through >= last_id:
+            break
+
+        upper = copied_through + _MIGRATION_BATCH_ROWS
+        conn.execute(
+            """
+            INSERT INTO sales_new (dataset_id, item_id, day, quantity)
+            SELECT dataset_id, item_id, CAST(julianday(date) - 2440587.5 AS INTEGER), quantity
+            FROM sales
+            WHERE id > ? AND id <= ?
+            ON CONFLICT (dataset_id, item_id, day) DO UPDATE SET quantity = quantity + excluded.quantity
+            """,
+            (copied_through, upper),
+        )
+        conn.execute("DELETE FROM sales_migration")
+        conn.execute("INSERT INTO sales_migration (copied_through) VALUES (?)", (upper,))
+        conn.commit()
+
+    # Everything is copied and we hold the write lock: swap the tables
+    if _table_exists(conn, "sales_columns"):
+        old_rows = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        new_rows = conn.execute("SELECT COUNT(*) FROM sales_new").fetchone()[0]
+        if new_rows != old_rows:
+            conn.execute(
+                """
+                DELETE FROM sales_columns WHERE dataset_id IN (
+                  SELECT dataset_id FROM sales
+                  GROUP BY dataset_id, item_id, date HAVING COUNT(*) > 1
+                )
+                """
+            )
+    conn.execute("DROP TABLE sales")
+    conn.execute("ALTER TABLE sales_new RENAME TO sales")
+    conn.execute("DROP TABLE sales_migration")
+    # Version 1 only: init_db runs the later migrations and sets SCHEMA_VERSION
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+
+def _add_result_columns(conn: sqlite3.Connection) -> None:
+    """Add forecast_results.result_columns (schema version 2)."""
+    if not _table_exists(conn, "forecast_results"):
+        return
+    # Under the write lock, so concurrent workers don't both add the column
+    conn.execute("BEGIN IMMEDIATE")
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(forecast_results)")}
+    if "result_columns" not in columns:
+        conn.execute("ALTER TABLE forecast_results ADD COLUMN result_columns TEXT")
+    conn.commit()
 
 
 def init_db(db_path: str) -> None:
     """Create all tables and seed required rows if they don't already exist (idempotent)."""
     # Lazy import to avoid a hard dep at module level
     from services import hash_password
+    from dataset_summary import backfill_summaries
+    from sales_store import backfill_columns
 
     with connect(db_path) as conn:
+        # Migrations run before SCHEMA_SQL, which assumes the current layout
+        outdated = conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION
+        if outdated:
+            _migrate_sales_day_numbers(conn)
+            _add_result_columns(conn)
         conn.executescript(SCHEMA_SQL)
+        if outdated:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
         # Seed the Default prophet preset if it doesn't exist yet
         conn.execute(
@@ -150,10 +408,15 @@ def init_db(db_path: str) -> None:
         seed_email    = os.getenv("SEED_ADMIN_EMAIL",    "admin@pinkcafe.com")
         seed_password = os.getenv("SEED_ADMIN_PASSWORD", "pinkcafe2025")
         seed_username = os.getenv("SEED_ADMIN_USERNAME", "admin")
-        conn.execute(
-            "INSERT OR IGNORE INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (seed_username, seed_email, hash_password(seed_password)),
-        )
+        # Only hash when the row is actually missing - bcrypt is the slowest part of startup
+        seed_exists = conn.execute(
+            "SELECT 1 FROM users WHERE email = ? OR username = ?", (seed_email, seed_username)
+        ).fetchone()
+        if not seed_exists:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+                (seed_username, seed_email, hash_password(seed_password)),
+            )
 
         # # Migration: ensure datasets are tied to owning users.
         # dataset_columns = {
@@ -172,5 +435,11 @@ def init_db(db_path: str) -> None:
         #     (int(admin_user["id"]),),
         #   )
 
+        # Summaries for datasets uploaded before dataset_summary existed
+        backfill_summaries(conn)
+
         conn.commit()
 
+        # Columnar copies of datasets uploaded before sales_store existed
+        backfill_columns(conn)
+
@@ -0,0 +1,62 @@
+"""
+Shared process pools for CPU-bound model fitting.
+
+Pools are created lazily, one per name, inside each gunicorn worker.
+They use the 'spawn' start method because forking a multi-threaded
+gunicorn worker can copy held locks into the child process.
+
+A future that times out can't be cancelled once it is running, so callers
+that give up on a fit call discard_process_pool() to terminate the pool's
+processes instead of leaving a slot busy until the fit finishes.
+"""
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pools: dict = {}
+_lock = threading.Lock()
+
+
+def is_main_process() -> bool:
+    """True unless we are running inside one of the pool's child processes."""
+    return multiprocessing.parent_process() is None
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """Return the named process pool, creating (or replacing a broken) one if needed."""
+    with _lock:
+        pool = _pools.get(name)
+        # A pool whose child died can't accept new work; start a fresh one
+        if pool is None or getattr(pool, "_broken", False):
+            pool = ProcessPoolExecutor(
+                max_workers=max(1, int(max_workers)),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pools[name] = pool
+        return pool
+
+
+def discard_process_pool(name: str, pool: ProcessPoolExecutor) -> None:
+    """
+    Terminate a pool's processes (e.g. after a fit in it timed out) and drop
+    it, so the next get_process_pool(name) starts a fresh one. Other work
+    still running in it fails with BrokenProcessPool.
+    """
+    with _lock:
+        if _pools.get(name) is pool:
+            del _pools[name]
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """Stop all pools without waiting for queued work (jobs are persisted in the DB)."""
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
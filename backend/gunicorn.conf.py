@@ -0,0 +1,21 @@
+"""
+gunicorn settings for the Pink Cafe backend.
+
+gunicorn reads this file from its working directory (backend/); flags on
+the command line, as in the Dockerfile, still take precedence.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Prophet"))
+
+from config import PREWARM_MODELS
+
+
+def post_fork(server, worker):
+    """With PREWARM_MODELS=1, load the modelling libraries before the worker takes requests."""
+    if PREWARM_MODELS:
+        from forecasting import prewarm_models
+        prewarm_models()
+        server.log.info("Worker %s: forecasting models pre-warmed", worker.pid)
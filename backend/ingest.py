@@ -0,0 +1,416 @@
+"""
+Sales ingest helpers for the Pink Cafe backend.
+
+upload_csv in routes.py parses the CSV into a wide DataFrame (one 'Date'
+column plus one column per product); these helpers write it to the
+items / sales tables in bulk instead of one INSERT per cell.
+
+ingest_csv_stream() is the bounded-memory alternative for very large
+exports: it detects the header from the first few lines, then parses,
+validates and inserts the file in fixed-size chunks. append_csv_stream()
+reads a file the same way but only adds the days an existing dataset
+doesn't have yet.
+"""
+
+import io
+import re
+import sqlite3
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+_COFFEE_KEYWORDS = ("coffee", "cappuccino", "americano")
+_QUANTITY_HEADER_NAMES = {"number sold", "sales", "quantity", "qty"}
+_HEADERLESS_DATE_RE = re.compile(r"^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}$")
+
+# Lines read up front to find the header / two-row subheader in stream mode
+HEADER_SCAN_LINES = 50
+
+
+class IngestError(ValueError):
+    """Raised when an uploaded CSV is malformed; the message is safe to show users."""
+    pass
+
+
+def categorize_item(name: str) -> str:
+    """Simple heuristic: coffee drinks are 'coffee', everything else is 'food'."""
+    lowered = name.lower()
+    return "coffee" if any(k in lowered for k in _COFFEE_KEYWORDS) else "food"
+
+
+def ensure_items(conn: sqlite3.Connection, names: list[str]) -> dict[str, int]:
+    """Create any missing items in one batch and return {name: item_id}."""
+    if not names:
+        return {}
+    conn.executemany(
+        "INSERT OR IGNORE INTO items (name, category) VALUES (?, ?)",
+        [(name, categorize_item(name)) for name in names],
+    )
+    rows = conn.execute(
+        f"SELECT id, name FROM items WHERE name IN ({','.join('?' * len(names))})",
+        list(names),
+    ).fetchall()
+    return {row["name"]: int(row["id"]) for row in rows}
+
+
+def insert_sales(conn: sqlite3.Connection, dataset_id: int, df: pd.DataFrame,
+                 item_ids: dict[str, int]) -> int:
+    """
+    Insert a wide sales frame (Date + product columns) into the sales table.
+
+    The frame is melted to long (day number, item, quantity) arrays and
+    written with a single executemany; missing quantities are stored as 0
+    and a date that appears more than once is stored as the sum of its
+    rows. Does not commit, so the caller controls the transaction. Returns
+    the number of rows written.
+    """
+    product_cols = list(item_ids)
+    n_days = len(df)
+
+    # Melt to long format column by column: each date is converted to a day
+    # number once and repeated per product, quantities are read column-major
+    # to match.
+    days = np.tile(df["Date"].to_numpy(dtype="datetime64[D]").astype(np.int64), len(product_cols))
+    items = np.repeat([item_ids[col] for col in product_cols], n_days)
+    quantities = np.nan_to_num(df[product_cols].to_numpy(dtype=float).T.ravel(), nan=0).astype(np.int64)
+
+    with timed("sql", "insert_sales"):
+        conn.executemany(
+            """
+            INSERT INTO sales (dataset_id, item_id, day, quantity) VALUES (?, ?, ?, ?)
+            ON CONFLICT (dataset_id, item_id, day) DO UPDATE SET quantity = quantity + excluded.quantity
+            """,
+            zip([dataset_id] * len(days), items.tolist(), days.tolist(), quantities.tolist()),
+        )
+    return len(days)
+
+
+def detect_header(raw_df: pd.DataFrame) -> tuple[list[str], int]:
+    """
+    Find the column names of a raw (header=None, dtype=str) CSV frame.
+
+    Returns (column names, index of the first data row). Handles a 'Date'
+    header row anywhere in the frame, two-row headers such as
+        Date,Number Sold,
+        ,Cappuccino,Americano
+    and headerless files that start with dates (product names are
+    synthesized). Raises IngestError if none of those match.
+    """
+    date_header_idx = None
+    for idx in range(len(raw_df)):
+        first_cell = str(raw_df.iloc[idx, 0]).strip().lower()
+        if first_cell == 'date':
+            date_header_idx = idx
+            break
+
+    if date_header_idx is None:
+        # Fallback: headerless CSV. Treat first column as Date and synthesize product names.
+        first_value = str(raw_df.iloc[0, 0]).strip()
+        if not _HEADERLESS_DATE_RE.match(first_value):
+            raise IngestError("CSV must include a 'Date' header, or start with date values in the first column")
+
+        col_count = raw_df.shape[1]
+        if col_count < 2:
+            raise IngestError("CSV must have at least one product column")
+        return ['Date'] + [f'Product {i}' for i in range(1, col_count)], 0
+
+    header_row = raw_df.iloc[date_header_idx].fillna('').astype(str).str.strip()
+    data_start_idx = date_header_idx + 1
+
+    if data_start_idx < len(raw_df):
+        subheader_row = raw_df.iloc[data_start_idx].fillna('').astype(str).str.strip()
+        first_subheader_cell = str(subheader_row.iloc[0]).strip().lower()
+        has_named_subheaders = any(str(v).strip() for v in subheader_row.iloc[1:])
+        if first_subheader_cell in {'', 'nan'} and has_named_subheaders:
+            combined_header = []
+            for col_idx in range(len(header_row)):
+                if col_idx == 0:
+                    combined_header.append('Date')
+                    continue
+
+                primary_name = str(header_row.iloc[col_idx]).strip()
+                secondary_name = str(subheader_row.iloc[col_idx]).strip()
+                if secondary_name:
+                    combined_header.append(secondary_name)
+                elif primary_name and primary_name.lower() not in _QUANTITY_HEADER_NAMES:
+                    combined_header.append(primary_name)
+                else:
+                    combined_header.append(f'Product {col_idx}')
+
+            return combined_header, data_start_idx + 1
+
+    return list(header_row), data_start_idx
+
+
+class _RunningStats:
+    """Incrementally tracks what upload_csv reports for a whole file."""
+
+    def __init__(self, product_cols: list[str]):
+        self.product_cols = product_cols
+        self.rows = 0
+        self.count = dict.fromkeys(product_cols, 0)
+        self.total = dict.fromkeys(product_cols, 0.0)
+        self.min = dict.fromkeys(product_cols, np.inf)
+        self.max = dict.fromkeys(product_cols, -np.inf)
+        self.missing = dict.fromkeys(product_cols, 0)
+        self.has_negatives = False
+        self.chronological = True
+        self.last_date = None
+        self.min_date = None
+        self.max_date = None
+        self.preview = []
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        dates = chunk['Date']
+        values = chunk[self.product_cols]
+
+        if self.last_date is not None and dates.iloc[0] < self.last_date:
+            self.chronological = False
+        self.chronological = self.chronological and dates.is_monotonic_increasing
+        self.last_date = dates.iloc[-1]
+        self.min_date = dates.min() if self.min_date is None else min(self.min_date, dates.min())
+        self.max_date = dates.max() if self.max_date is None else max(self.max_date, dates.max())
+
+        self.has_negatives = self.has_negatives or bool((values < 0).any().any())
+        for col in self.product_cols:
+            column = values[col]
+            non_null = int(column.notna().sum())
+            self.missing[col] += len(column) - non_null
+            if non_null:
+                self.count[col] += non_null
+                self.total[col] += float(column.sum())
+                self.min[col] = min(self.min[col], float(column.min()))
+                self.max[col] = max(self.max[col], float(column.max()))
+
+        if len(self.preview) < 10:
+            head = chunk.head(10 - len(self.preview))
+            self.preview.extend(head.assign(Date=head['Date'].dt.strftime('%d/%m/%Y')).to_dict(orient='records'))
+        self.rows += len(chunk)
+
+
+def _csv_chunks(binary_stream, chunk_rows: int):
+    """
+    Detect the header of a CSV upload and return (product columns, chunks),
+    where chunks lazily parses the file chunk_rows data rows at a time into
+    frames of a 'Date' column plus numeric product columns (blank cells are
+    NaN). Raises IngestError for a malformed header here, and for bad dates
+    while iterating.
+    """
+    binary_stream.seek(0)
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+    head_text = ''.join(islice(text, HEADER_SCAN_LINES))
+    text.detach()
+    if not head_text.strip():
+        raise IngestError("Uploaded CSV is empty")
+
+    raw_head = pd.read_csv(io.StringIO(head_text), header=None, dtype=str, skip_blank_lines=True)
+    if raw_head.empty:
+        raise IngestError("Uploaded CSV is empty")
+    columns, data_start_idx = detect_header(raw_head)
+
+    # Positions of named columns (unnamed columns are dropped, as in upload_csv)
+    names = [str(col).strip() for col in columns]
+    keep = [i for i, name in enumerate(names) if name]
+    names = [names[i] for i in keep]
+    if 'Date' not in names:
+        raise IngestError("CSV must have a 'Date' column")
+    product_cols = [name for name in names if name != 'Date']
+    if not product_cols:
+        raise IngestError("CSV must have at least one product column")
+
+    def chunks():
+        binary_stream.seek(0)
+        text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            rows_seen = 0
+            reader = pd.read_csv(text, header=None, dtype=str, skip_blank_lines=True, chunksize=chunk_rows)
+            for raw_chunk in reader:
+                # Skip the header rows (they only appear in the first chunk)
+                skip = max(0, data_start_idx - rows_seen)
+                rows_seen += len(raw_chunk)
+                chunk = raw_chunk.iloc[skip:, keep]
+                if chunk.empty:
+                    continue
+                chunk.columns = names
+
+                try:
+                    dates = pd.to_datetime(chunk['Date'].astype(str).str.strip(), format='%d/%m/%Y')
+                except Exception as e:
+                    raise IngestError(f"Dates must be in dd/mm/yyyy format. Error: {str(e)}")
+                if dates.isnull().any():
+                    raise IngestError("Some rows have invalid or missing dates. Please check your CSV.")
+
+                # Blank cells become NaN here, so no per-cell regex pass is needed
+                yield pd.DataFrame(
+                    {col: pd.to_numeric(chunk[col], errors='coerce') for col in product_cols}
+                ).assign(Date=dates.to_numpy())[['Date'] + product_cols].reset_index(drop=True)
+        finally:
+            text.detach()
+
+    return product_cols, chunks()
+
+
+def ingest_csv_stream(conn: sqlite3.Connection, dataset_id: int, binary_stream,
+                      chunk_rows: int) -> dict:
+    """
+    Parse and insert a CSV upload in chunks of chunk_rows data rows.
+
+    Memory stays bounded by the chunk size: the header is detected from the
+    first HEADER_SCAN_LINES lines, the file is then re-read in chunks and
+    every chunk is validated, inserted and folded into running stats.
+    Product columns that turn out to be empty in every row are removed at
+    the end. Does not commit. Raises IngestError for malformed files.
+
+    Returns the same summary fields upload_csv reports for in-memory uploads.
+    """
+    product_cols, chunks = _csv_chunks(binary_stream, chunk_rows)
+    item_ids = ensure_items(conn, product_cols)
+    stats = _RunningStats(product_cols)
+
+    for chunk in chunks:
+        stats.update(chunk)
+        insert_sales(conn, dataset_id, chunk, item_ids)
+
+    if stats.rows == 0:
+        raise IngestError("Uploaded CSV is empty")
+
+    # Product columns with no values at all are dropped, as in upload_csv
+    empty_cols = [col for col in product_cols if stats.count[col] == 0]
+    if empty_cols:
+        conn.executemany(
+            "DELETE FROM sales WHERE dataset_id = ? AND item_id = ?",
+            [(dataset_id, item_ids[col]) for col in empty_cols],
+        )
+        product_cols = [col for col in product_cols if col not in empty_cols]
+        if not product_cols:
+            raise IngestError("CSV must have at least one product column")
+
+    return {
+        "products": product_cols,
+        "item_ids": {col: item_ids[col] for col in product_cols},
+        "rowCount": stats.rows,
+        "dateRange": {
+            "start": stats.min_date.strftime('%d/%m/%Y'),
+            "end": stats.max_date.strftime('%d/%m/%Y'),
+        },
+        "stats": {
+            col: {
+                'avg': round(stats.total[col] / stats.count[col], 1),
+                'min': int(stats.min[col]),
+                'max': int(stats.max[col]),
+            }
+            for col in product_cols
+        },
+        "preview": [
+            {k: v for k, v in row.items() if k == 'Date' or k in product_cols}
+            for row in stats.preview
+        ],
+        "validationChecks": {
+            "validDates": True,
+            "noMissingValues": not any(stats.missing[col] for col in product_cols),
+            "noNegatives": not stats.has_negatives,
+            "chronological": stats.chronological,
+            "productsDetected": len(product_cols),
+        },
+    }
+
+
+def append_sales(conn: sqlite3.Connection, dataset_id: int, df: pd.DataFrame,
+                 item_ids: dict[str, int]) -> dict[int, np.ndarray]:
+    """
+    Insert the cells of a wide sales frame whose (item, day) the dataset
+    doesn't have yet.
+
+    Unlike insert_sales, blank cells are skipped rather than stored as 0
+    (so a product missing from the new file gains no zero days), and a day
+    that is already stored, or repeated in the frame, keeps its first
+    value. Does not commit. Returns {item_id: day numbers inserted}, sorted.
+    """
+    days = df["Date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    added = {}
+    rows = []
+    with timed("sql", "append_sales"):
+        for col, item_id in item_ids.items():
+            quantities = df[col].to_numpy(dtype=float)
+            present = ~np.isnan(quantities)
+            if not present.any():
+                continue
+            item_days, quantities = days[present], quantities[present]
+
+            stored = conn.execute(
+                "SELECT day FROM sales WHERE dataset_id = ? AND item_id = ? AND day BETWEEN ? AND ?",
+                (dataset_id, item_id, int(item_days.min()), int(item_days.max())),
+            ).fetchall()
+            new = ~np.isin(item_days, [row[0] for row in stored])
+            # np.unique sorts the days and keeps the first row of a repeated one
+            new_days, first = np.unique(item_days[new], return_index=True)
+            if not len(new_days):
+                continue
+            added[item_id] = new_days
+            rows.extend(zip(
+                [dataset_id] * len(new_days), [item_id] * len(new_days),
+                new_days.tolist(), quantities[new][first].astype(np.int64).tolist(),
+            ))
+
+        # DO NOTHING covers a concurrent append that stored the same day first
+        conn.executemany(
+            """
+            INSERT INTO sales (dataset_id, item_id, day, quantity) VALUES (?, ?, ?, ?)
+            ON CONFLICT (dataset_id, item_id, day) DO NOTHING
+            """,
+            rows,
+        )
+    return added
+
+
+def append_csv_stream(conn: sqlite3.Connection, dataset_id: int, binary_stream,
+                      chunk_rows: int) -> dict:
+    """
+    Add the new days of a CSV upload to an existing dataset, chunk by chunk.
+
+    The file is read like ingest_csv_stream reads it; each chunk goes
+    through append_sales. Does not commit. Raises IngestError for malformed
+    files. Returns the products and rows read plus what changed: the rows
+    added, and the span of added days overall and per product.
+    """
+    product_cols, chunks = _csv_chunks(binary_stream, chunk_rows)
+    item_ids = ensure_items(conn, product_cols)
+
+    rows_read = 0
+    added: dict[int, list] = {}
+    for chunk in chunks:
+        rows_read += len(chunk)
+        for item_id, days in append_sales(conn, dataset_id, chunk, item_ids).items():
+            added.setdefault(item_id, []).append(days)
+
+    if rows_read == 0:
+        raise IngestError("Uploaded CSV is empty")
+
+    changed_items = {}
+    for col in product_cols:
+        if item_ids[col] in added:
+            days = np.concatenate(added[item_ids[col]])
+            changed_items[col] = {**_day_range(days.min(), days.max()), "days": int(len(days))}
+
+    all_days = [days for parts in added.values() for days in parts]
+    return {
+        "products": product_cols,
+        "item_ids": {col: item_ids[col] for col in product_cols},
+        "rowCount": rows_read,
+        "rowsAdded": sum(item["days"] for item in changed_items.values()),
+        "changedRange": (
+            _day_range(min(d.min() for d in all_days), max(d.max() for d in all_days)) if all_days else None
+        ),
+        "changedItems": changed_items,
+    }
+
+
+def _day_range(first_day, last_day) -> dict:
+    """{'start', 'end'} in upload_csv's dd/mm/yyyy format for two day numbers."""
+    return {
+        "start": pd.Timestamp(int(first_day), unit="D").strftime('%d/%m/%Y'),
+        "end": pd.Timestamp(int(last_day), unit="D").strftime('%d/%m/%Y'),
+    }
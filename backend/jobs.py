@@ -0,0 +1,183 @@
+"""
+Background forecast jobs for the Pink Cafe backend.
+
+Jobs are persisted in the forecast_jobs table and run in a process pool,
+so Prophet / SARIMA fits never block gunicorn request threads. A job is
+claimed atomically (queued -> running) by whichever process runs it, so
+resubmitting the same job id is always safe.
+
+Tuning jobs are the exception: they mostly wait on their own candidate
+pool (see Prophet/tuning.py), so they run on a daemon thread in this
+process, where that pool is available.
+
+create_job() + submit_job() are called from routes.py;
+resume_pending_jobs() is called once on startup from app.py.
+"""
+
+import sys, os, json, uuid, logging, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Prophet'))
+
+from config import FORECAST_JOB_WORKERS
+from db import connect
+from executors import get_process_pool, is_main_process
+
+JOB_KINDS = ("forecast", "comparison", "tuning")
+
+# Kinds that fan out to their own process pool, so run on a thread here
+_THREAD_KINDS = ("tuning",)
+
+_POOL_NAME = "jobs"
+
+
+def create_job(conn, user_id: int, kind: str, params: dict) -> str:
+    """Insert a queued job and return its id. Raises ValueError for an unknown kind."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(JOB_KINDS)}")
+    job_id = uuid.uuid4().hex
+    conn.execute(
+        "INSERT INTO forecast_jobs (id, user_id, kind, params) VALUES (?, ?, ?, ?)",
+        (job_id, user_id, kind, json.dumps(params)),
+    )
+    conn.commit()
+    return job_id
+
+
+def get_job(conn, job_id: str, user_id: int):
+    """Return a job owned by user_id as a dict, or None if it doesn't exist."""
+    row = conn.execute(
+        """
+        SELECT id, kind, status, result, error, created_at, started_at, finished_at
+        FROM forecast_jobs
+        WHERE id = ? AND user_id = ?
+        """,
+        (job_id, user_id),
+    ).fetchone()
+    if not row:
+        return None
+
+    job = {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+    if row["status"] == "done":
+        job["result"] = json.loads(row["result"])
+    elif row["status"] == "failed":
+        job["error"] = row["error"]
+    return job
+
+
+def submit_job(db_path: str, job_id: str) -> None:
+    """Hand a queued job to the process pool (or a thread, for tuning jobs)."""
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT kind FROM forecast_jobs WHERE id = ?", (job_id,)).fetchone()
+    if row and row["kind"] in _THREAD_KINDS:
+        threading.Thread(target=_execute_job, args=(db_path, job_id), name=f"job-{job_id}", daemon=True).start()
+    else:
+        get_process_pool(_POOL_NAME, FORECAST_JOB_WORKERS).submit(_execute_job, db_path, job_id)
+
+
+def resume_pending_jobs(db_path: str) -> int:
+    """
+    Re-submit jobs left over from a previous run and return how many were found.
+
+    Jobs still marked 'running' whose owning process is gone were interrupted
+    by a restart, so they are put back in the queue first.
+    """
+    if not is_main_process():
+        return 0
+
+    with connect(db_path) as conn:
+        running = conn.execute(
+            "SELECT id, worker_pid FROM forecast_jobs WHERE status = 'running'"
+        ).fetchall()
+        for row in running:
+            if not _process_alive(row["worker_pid"]):
+                conn.execute(
+                    "UPDATE forecast_jobs SET status = 'queued', started_at = NULL WHERE id = ?",
+                    (row["id"],),
+                )
+        conn.commit()
+
+        queued = conn.execute(
+            "SELECT id FROM forecast_jobs WHERE status = 'queued' ORDER BY created_at"
+        ).fetchall()
+
+    for row in queued:
+        submit_job(db_path, row["id"])
+    return len(queued)
+
+
+# ---------------------------------------------------------------------------
+# Internal helpers
+# ---------------------------------------------------------------------------
+
+def _process_alive(pid) -> bool:
+    """Return True if pid belongs to a live process other than this one."""
+    if not pid or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except OSError:
+        return False
+    return True
+
+
+def _execute_job(db_path: str, job_id: str) -> None:
+    """Run a single job inside a pool process (or thread) and record its outcome."""
+    # Imported here so the heavy model libraries load in the pool process only
+    from forecasting import ForecastError, run_forecast
+    from comparison import run_comparison
+    from tuning import run_tuning
+
+    # The process that owns the job: the server itself for thread jobs
+    owner_pid = os.getpid() if is_main_process() else os.getppid()
+
+    with connect(db_path) as conn:
+        claimed = conn.execute(
+            """
+            UPDATE forecast_jobs
+            SET status = 'running', started_at = CURRENT_TIMESTAMP, worker_pid = ?
+            WHERE id = ? AND status = 'queued'
+            """,
+            (owner_pid, job_id),
+        )
+        conn.commit()
+        if claimed.rowcount == 0:
+            return  # already taken by another process, or finished
+
+        row = conn.execute(
+            "SELECT kind, params FROM forecast_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        params = json.loads(row["params"])
+
+        try:
+            if row["kind"] == "forecast":
+                result = run_forecast(conn, **params)
+            elif row["kind"] == "tuning":
+                result = run_tuning(conn, **params)
+            else:
+                result = run_comparison(conn, **params)
+        except ForecastError as e:
+            _finish(conn, job_id, error=str(e))
+        except Exception:
+            logging.exception("Forecast job %s failed", job_id)
+            _finish(conn, job_id, error="Job failed. Please check server logs.")
+        else:
+            _finish(conn, job_id, result=result)
+
+
+def _finish(conn, job_id: str, result: dict = None, error: str = None) -> None:
+    """Mark a running job as done (with result) or failed (with error)."""
+    conn.execute(
+        """
+        UPDATE forecast_jobs
+        SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        ("failed" if error else "done", json.dumps(result) if result is not None else None, error, job_id),
+    )
+    conn.commit()
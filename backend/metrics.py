@@ -0,0 +1,267 @@
+"""
+Lightweight in-process metrics for the Pink Cafe backend.
+
+Counters, gauges and histograms live in a module-level registry and are
+rendered in the Prometheus text format at GET /api/metrics (authenticated,
+see config.METRICS_TOKEN). Hot paths are timed with `timed()`:
+
+    with timed("sql", "load_history"):
+        ...
+
+which observes pinkcafe_stage_seconds{stage="sql", detail="load_history"}.
+Stages recorded: startup (create_app steps), sql, fit / predict (per
+engine), prophet_fit (Stan optimisation, cache misses only) and serialize.
+
+Metrics are per process, like the model cache: each gunicorn worker
+reports its own. Stage timings recorded inside forecast / comparison /
+tuning pool processes are shipped back with the result (collect_stages /
+merge_stages) and counted in the worker that submitted the work; timings
+from background job processes are not reported.
+
+install_request_metrics() adds per-request counters and latency, plus an
+opt-in profiling mode (PROFILE_REQUESTS=1): a request with ?profile=1 or an
+X-Profile: 1 header is run under cProfile and, if it took at least
+PROFILE_MIN_MS, its stats are dumped to PROFILE_DIR.
+"""
+
+import cProfile
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import PROFILE_DIR, PROFILE_MIN_MS, PROFILE_REQUESTS
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """A named metric family holding one value per label set."""
+
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, label_values: dict) -> tuple:
+        return tuple(str(label_values.get(label, "")) for label in self.labels)
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> list[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _render_value(self, key, state) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, state):
+            cumulative += count
+            le = 'le="%g"' % bound
+            lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{self._label_text(key, le)} {state[-1]}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_number(state[-2])}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """All metric families of this process, plus callbacks run before each render."""
+
+    def __init__(self):
+        self._metrics: dict = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, tuple(labels), **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, fn) -> None:
+        """Register fn() to refresh gauges (e.g. cache sizes) just before rendering."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        for fn in collectors:
+            try:
+                fn()
+            except Exception:
+                logging.exception("Metrics collector failed")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pinkcafe_stage_seconds", "Time spent in instrumented backend stages.", ("stage", "detail"),
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "pinkcafe_http_requests_total", "HTTP requests served.", ("method", "endpoint", "status"),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "pinkcafe_http_request_seconds", "HTTP request latency (until the response is returned).",
+    ("method", "endpoint"),
+)
+
+# Stage samples recorded while running under collect_stages (pool processes)
+_capture = threading.local()
+
+
+@contextmanager
+def timed(stage: str, detail: str = ""):
+    """Observe the duration of the with-block under pinkcafe_stage_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, detail=detail)
+        samples = getattr(_capture, "samples", None)
+        if samples is not None:
+            samples.append((stage, detail, elapsed))
+
+
+def collect_stages(fn, *args, **kwargs):
+    """
+    Run fn in a pool process and return (its result, the stage samples it
+    recorded), for merge_stages() in the submitting process.
+    """
+    _capture.samples = []
+    try:
+        return fn(*args, **kwargs), _capture.samples
+    finally:
+        _capture.samples = None
+
+
+def merge_stages(collected):
+    """Record the samples from a collect_stages() result here and return fn's result."""
+    result, samples = collected
+    for stage, detail, elapsed in samples:
+        STAGE_SECONDS.observe(elapsed, stage=stage, detail=detail)
+    return result
+
+
+def install_request_metrics(app) -> None:
+    """Count and time every request, and wire up opt-in cProfile dumps."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+        if PROFILE_REQUESTS and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUESTS_TOTAL.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint)
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed * 1000 >= PROFILE_MIN_MS:
+                response.headers["X-Profile-File"] = os.path.basename(_dump_profile(profiler, endpoint, elapsed))
+        return response
+
+
+def _dump_profile(profiler: cProfile.Profile, endpoint: str, elapsed: float) -> str:
+    """Write a request's cProfile stats to PROFILE_DIR and return the file path."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = endpoint.strip("/").replace("/", "_").replace("<", "").replace(">", "") or "root"
+    path = os.path.join(
+        PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed * 1000:.0f}ms-{os.getpid()}.prof"
+    )
+    profiler.dump_stats(path)
+    logging.info("Request profile written to %s (view with: python -m pstats %s)", path, path)
+    return path
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
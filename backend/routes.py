@@ -5,22 +5,43 @@ Call register_routes(app) from app.py to attach everything to the Flask app.
 
 Endpoints:
   GET  /api                  - health check
+  GET  /api/metrics          - Prometheus metrics for this worker (authenticated; see METRICS_TOKEN)
   POST /api/v1/auth/register - create account
   POST /api/v1/auth/login    - log in
-  GET  /api/v1/forecast      - run a Prophet (or baseline) forecast
+  POST /api/v1/auth/logout   - revoke the current session token
+  GET  /api/v1/forecast      - run a Prophet (or SARIMA / linear / baseline) forecast (JSON, NDJSON rows or columns)
+  GET  /api/v1/forecast/bulk - forecast every item in a dataset (NDJSON stream)
+  POST /api/v1/jobs          - queue a forecast / comparison job
+  GET  /api/v1/jobs/<job_id> - job status and result
 """
 
-import sys, os, re, secrets
+import sys, os, re, json, hmac
 from functools import wraps
-from datetime import datetime, timedelta, timezone
+from typing import Optional
+from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Prophet'))
 
-from flask import Flask, jsonify, request, current_app, g
+import msgpack
+from flask import Flask, Response, jsonify, request, current_app, g, stream_with_context
 import logging
 from db import connect
-from services import hash_password, verify_password
-from forecasting import ForecastError, run_forecast
+from services import HashingBusyError, hash_password, verify_password
+from sessions import create_session, lookup_session, revoke_session
+from forecasting import (
+    ForecastError,
+    iter_dataset_forecasts_json,
+    run_forecast_json,
+    split_forecast_json,
+)
 from comparison import run_comparison
+from tuning import validate_space
+from result_store import invalidate_dataset, invalidate_items
+from jobs import create_job, get_job, submit_job
+from dataset_summary import list_summaries, refresh_summary, save_summary
+from sales_store import drop_dataset, export_dataset
+from ingest import IngestError, append_csv_stream, detect_header, ensure_items, ingest_csv_stream, insert_sales
+from config import METRICS_TOKEN, UPLOAD_CHUNK_ROWS, UPLOAD_STREAM_THRESHOLD_BYTES
+from metrics import REGISTRY, timed
 from prophet_settings import (
     list_presets,
     get_preset,
@@ -49,6 +70,41 @@ def _int(name: str, raw) -> int:
         raise ValueError(f"{name} must be an integer")
 
 
+def _int_list(name: str, raw) -> list[int]:
+    """Parse a comma-separated query-string value (e.g. '1,4,8') to a list of ints."""
+    parts = [p.strip() for p in str(raw).split(",") if p.strip()]
+    if not parts:
+        raise ValueError(f"{name} must be an integer or a comma-separated list of integers")
+    try:
+        return [int(p) for p in parts]
+    except Exception:
+        raise ValueError(f"{name} must be an integer or a comma-separated list of integers")
+
+
+# Response formats that can be asked for with ?format= or an Accept header
+_FORMAT_MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "columns": "application/vnd.pinkcafe.columns+json",
+    "msgpack": "application/x-msgpack",
+}
+
+
+def _response_format(allowed: tuple) -> Optional[str]:
+    """
+    Pick a response format from ?format=, else from the Accept header,
+    defaulting to allowed[0]. Returns None for an unsupported ?format=.
+    """
+    requested = request.args.get("format")
+    if requested is not None:
+        return requested if requested in allowed else None
+    best = request.accept_mimetypes.best_match([_FORMAT_MIMETYPES[name] for name in allowed])
+    for name in allowed:
+        if _FORMAT_MIMETYPES[name] == best:
+            return name
+    return allowed[0]
+
+
 def _db() -> str:
     """Get the configured DB path from the Flask app config."""
     return current_app.config.get("DATABASE_PATH", "data/pinkcafe.db")
@@ -66,18 +122,22 @@ def require_auth(f):
         if not auth_header.startswith("Bearer "):
             return _err("Authentication required", 401)
         token = auth_header[7:]
-        with connect(_db()) as conn:
-            row = conn.execute(
-                "SELECT user_id FROM sessions WHERE token = ? AND expires_at > datetime('now')",
-                (token,)
-            ).fetchone()
-        if not row:
+        user_id = lookup_session(_db(), token)
+        if user_id is None:
             return _err("Invalid or expired token", 401)
-        g.current_user_id = int(row["user_id"])
+        g.current_user_id = user_id
+        g.session_token = token
         return f(*args, **kwargs)
     return decorated
 
 
+def _is_metrics_token(auth_header: str) -> bool:
+    """True if the request carries the configured METRICS_TOKEN (never when it is unset)."""
+    if not METRICS_TOKEN:
+        return False
+    return hmac.compare_digest(auth_header.encode(), f"Bearer {METRICS_TOKEN}".encode())
+
+
 def _current_user_id() -> int:
     """Return the authenticated user id set by require_auth."""
     uid = getattr(g, "current_user_id", None)
@@ -98,6 +158,19 @@ def register_routes(app: Flask) -> None:
     def health():
         return jsonify({"message": "Pink Cafe API", "status": "ok"})
 
+    def _metrics_response():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/api/metrics")
+    def metrics():
+        """
+        Prometheus text-format metrics for this worker process. Needs a
+        session token, or METRICS_TOKEN when one is configured.
+        """
+        if _is_metrics_token(request.headers.get("Authorization", "")):
+            return _metrics_response()
+        return require_auth(_metrics_response)()
+
 
     # --- Auth ---------------------------------------------------------------
 
@@ -119,11 +192,17 @@ def register_routes(app: Flask) -> None:
                 "underscores, apostrophes, and dots (max 50 characters)"
             )
 
+        # Hash before touching the DB so no connection is held during bcrypt
+        try:
+            password_hash = hash_password(password)
+        except HashingBusyError as e:
+            return _err(str(e), 503)
+
         with connect(_db()) as conn:
             try:
                 conn.execute(
                     "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-                    (username, email, hash_password(password)),
+                    (username, email, password_hash),
                 )
                 conn.commit()
                 return jsonify({"success": True, "message": "Registered successfully"}), 201
@@ -148,18 +227,14 @@ def register_routes(app: Flask) -> None:
                 (email,),
             ).fetchone()
 
-        if not user or not verify_password(password, user["password_hash"]):
-            return _err("Invalid email or password", 401)
+        try:
+            if not user or not verify_password(password, user["password_hash"]):
+                return _err("Invalid email or password", 401)
+        except HashingBusyError as e:
+            return _err(str(e), 503)
 
-        # Issue a 24-hour session token
-        token = secrets.token_urlsafe(32)
-        expires = datetime.now(timezone.utc) + timedelta(hours=24)
-        with connect(_db()) as conn:
-            conn.execute(
-                "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
-                (token, int(user["id"]), expires.strftime("%Y-%m-%d %H:%M:%S")),
-            )
-            conn.commit()
+        # Issue a session token (24 hours by default)
+        token = create_session(_db(), int(user["id"]))
 
         return jsonify({
             "success": True,
@@ -168,6 +243,14 @@ def register_routes(app: Flask) -> None:
         })
 
 
+    @app.post("/api/v1/auth/logout")
+    @require_auth
+    def logout():
+        """Revoke the bearer token used for this request."""
+        revoke_session(_db(), g.session_token)
+        return jsonify({"success": True, "message": "Logged out"})
+
+
     # --- Forecast -----------------------------------------------------------
 
     @app.get("/api/v1/forecast")
@@ -177,9 +260,23 @@ def register_routes(app: Flask) -> None:
         Run a sales forecast. Query params:
           dataset_id   - required
           item_id      - required
-          algorithm    - 'prophet' (default) or 'baseline'
+          algorithm    - 'prophet' (default), 'sarima', 'linear_regression' or
+                         'baseline' (millisecond seasonal-naive smoothing)
           train_weeks  - weeks of history to train on (4-8, default 6)
-          horizon_weeks - weeks to forecast into the future (default 4)
+          horizon_weeks - weeks to forecast into the future (default 4), or a
+                          comma-separated list (e.g. '1,4,8,52') to fit once and
+                          return one forecast per horizon under "forecasts"
+          format       - 'json' (default) or 'ndjson': stream the result as
+                         NDJSON, a header line with everything but the rows,
+                         then one {date, yhat, yhat_lower, yhat_upper} line per
+                         day (the longest horizon's rows for a list), then
+                         {"done": true, "rows": <count>}; 'columns': the
+                         result with "forecast" as {start, yhat, yhat_lower,
+                         yhat_upper}, the start date plus one array per series
+                         (the longest horizon's for a list; horizon h is the
+                         first h * 7 values); 'msgpack': the same as
+                         MessagePack.
+                         Also chosen by the Accept header (see _FORMAT_MIMETYPES).
         """
         dataset_id_raw   = request.args.get("dataset_id")
         item_id_raw      = request.args.get("item_id")
@@ -196,10 +293,18 @@ def register_routes(app: Flask) -> None:
             dataset_id    = _int("dataset_id", dataset_id_raw)
             item_id       = _int("item_id", item_id_raw)
             train_weeks   = _int("train_weeks", train_weeks_raw)
-            horizon_weeks = _int("horizon_weeks", horizon_weeks_raw)
+            if "," in horizon_weeks_raw:
+                horizon_weeks = _int_list("horizon_weeks", horizon_weeks_raw)
+            else:
+                horizon_weeks = _int("horizon_weeks", horizon_weeks_raw)
         except ValueError as e:
             return _err(str(e))
 
+        formats = ("json", "ndjson", "columns", "msgpack")
+        response_format = _response_format(formats)
+        if response_format is None:
+            return _err(f"format must be one of: {', '.join(formats)}")
+
         with connect(_db()) as conn:
             try:
                 owner_row = conn.execute(
@@ -209,17 +314,106 @@ def register_routes(app: Flask) -> None:
                 if not owner_row:
                     return _err("Dataset not found", 404)
 
-                return jsonify(run_forecast(
+                # Already JSON text: sent as it is stored, never re-encoded
+                result_json = run_forecast_json(
                     conn,
                     dataset_id=dataset_id,
                     item_id=item_id,
                     algorithm=algorithm,
                     train_weeks=train_weeks,
                     horizon_weeks=horizon_weeks,
-                ))
+                    columnar=response_format in ("columns", "msgpack"),
+                )
             except ForecastError as e:
                 return _err(str(e))
 
+        mimetype = _FORMAT_MIMETYPES[response_format]
+        if response_format == "ndjson":
+            return Response(_forecast_ndjson(result_json), mimetype=mimetype)
+        if response_format == "msgpack":
+            # Three flat float arrays to decode, not a dict per row
+            with timed("serialize", "msgpack"):
+                body = msgpack.packb(json.loads(result_json))
+            return Response(body, mimetype=mimetype)
+        return Response(result_json, mimetype=mimetype)
+
+    def _forecast_ndjson(result_json):
+        """Yield a forecast result as NDJSON: header, one line per row, done line."""
+        with timed("serialize", "ndjson"):
+            # Row objects hold no nested braces, so "},{" only ever separates rows
+            head, rows = split_forecast_json(result_json)
+            count = rows.count("},{") + 1 if rows else 0
+        yield head + "\n"
+        if rows:
+            yield rows.replace("},{", "}\n{") + "\n"
+        yield json.dumps({"done": True, "rows": count}) + "\n"
+
+
+    @app.get("/api/v1/forecast/bulk")
+    @require_auth
+    def get_bulk_forecast():
+        """
+        Forecast every item in a dataset, streamed as NDJSON (one JSON object
+        per line) in the order items finish. Query params:
+          dataset_id    - required
+          algorithm     - 'prophet' (default) or any other engine (see /api/v1/forecast)
+          train_weeks   - weeks of history to train on (4-52, default 6)
+          horizon_weeks - int or comma-separated list, as for /api/v1/forecast
+        Each line is a run_forecast result plus item_id / item_name; the last
+        line is {"done": true, "items": <count>}.
+        """
+        dataset_id_raw    = request.args.get("dataset_id")
+        train_weeks_raw   = request.args.get("train_weeks", "6")
+        horizon_weeks_raw = request.args.get("horizon_weeks", "4")
+        algorithm         = request.args.get("algorithm", "prophet")
+
+        if not dataset_id_raw:
+            return _err("dataset_id is required")
+
+        try:
+            dataset_id  = _int("dataset_id", dataset_id_raw)
+            train_weeks = _int("train_weeks", train_weeks_raw)
+            if "," in horizon_weeks_raw:
+                horizon_weeks = _int_list("horizon_weeks", horizon_weeks_raw)
+            else:
+                horizon_weeks = _int("horizon_weeks", horizon_weeks_raw)
+        except ValueError as e:
+            return _err(str(e))
+
+        db_path = _db()
+        with connect(db_path) as conn:
+            owner_row = conn.execute(
+                "SELECT id FROM datasets WHERE id = ? AND uploaded_by_user_id = ?",
+                (dataset_id, _current_user_id()),
+            ).fetchone()
+        if not owner_row:
+            return _err("Dataset not found", 404)
+
+        def generate():
+            # Owns its own connection: the stream outlives this handler
+            with connect(db_path) as conn:
+                count = 0
+                # Each item arrives as JSON text, so lines need no encoding here
+                for item_json in iter_dataset_forecasts_json(
+                    conn, dataset_id=dataset_id, algorithm=algorithm,
+                    train_weeks=train_weeks, horizon_weeks=horizon_weeks,
+                ):
+                    count += 1
+                    yield item_json + "\n"
+                yield json.dumps({"done": True, "items": count}) + "\n"
+
+        # Prime the stream so bad params / missing data still return a JSON error
+        stream = generate()
+        try:
+            first = next(stream)
+        except ForecastError as e:
+            return _err(str(e))
+
+        def chained():
+            yield first
+            yield from stream
+
+        return Response(stream_with_context(chained()), mimetype="application/x-ndjson")
 
     # --- Algorithm comparison -----------------------------------------------
 
@@ -233,11 +427,17 @@ def register_routes(app: Flask) -> None:
           item_id      - required
           train_weeks  - weeks of history to train on (4-52, default 20)
           test_days    - days held out for testing (3-28, default 14)
+          mode         - 'single' (default, one trailing test window) or
+                         'rolling' (rolling-origin cross-validation)
+          folds        - rolling only: number of folds (1-20, default 5)
+          step_days    - rolling only: days between fold origins (default 7)
+          horizon_days - rolling only: days tested per fold (1-28, default 14)
         """
         dataset_id_raw = request.args.get("dataset_id")
         item_id_raw    = request.args.get("item_id")
         train_weeks_raw = request.args.get("train_weeks", "20")
         test_days_raw   = request.args.get("test_days", "14")
+        mode            = request.args.get("mode", "single")
 
         if not dataset_id_raw:
             return _err("dataset_id is required")
@@ -249,6 +449,9 @@ def register_routes(app: Flask) -> None:
             item_id     = _int("item_id", item_id_raw)
             train_weeks = _int("train_weeks", train_weeks_raw)
             test_days   = _int("test_days", test_days_raw)
+            folds        = _int("folds", request.args.get("folds", "5"))
+            step_days    = _int("step_days", request.args.get("step_days", "7"))
+            horizon_days = _int("horizon_days", request.args.get("horizon_days", "14"))
         except ValueError as e:
             return _err(str(e))
 
@@ -260,10 +463,102 @@ def register_routes(app: Flask) -> None:
                     item_id=item_id,
                     train_weeks=train_weeks,
                     test_days=test_days,
+                    mode=mode,
+                    folds=folds,
+                    step_days=step_days,
+                    horizon_days=horizon_days,
                 ))
             except ForecastError as e:
                 return _err(str(e))
 
+    # --- Background jobs ----------------------------------------------------
+
+    @app.post("/api/v1/jobs")
+    @require_auth
+    def create_forecast_job():
+        """
+        Queue a forecast or comparison to run off the request thread.
+        Body: {kind: 'forecast'|'comparison'|'tuning', dataset_id, item_id, ...}
+          forecast   - algorithm, train_weeks (default 6), horizon_weeks (int or list, default 4)
+          comparison - train_weeks (default 20), test_days (default 14), mode,
+                       folds, step_days, horizon_days (as for /api/v1/forecast/compare)
+          tuning     - train_weeks (default 20), search ('random'|'grid'), n_candidates
+                       (default 20), space ({column: [values]}, optional), folds (3),
+                       step_days (7), horizon_days (14), patience (3), seed,
+                       preset_name and base_preset (optional)
+        Returns 202 with a job_id to poll at GET /api/v1/jobs/<job_id>.
+        """
+        data = request.get_json(silent=True) or {}
+        kind = (data.get("kind") or "").strip()
+
+        if data.get("dataset_id") is None:
+            return _err("dataset_id is required")
+        if data.get("item_id") is None:
+            return _err("item_id is required")
+
+        try:
+            params = {
+                "dataset_id": _int("dataset_id", data["dataset_id"]),
+                "item_id":    _int("item_id", data["item_id"]),
+            }
+            if kind == "forecast":
+                horizon_raw = data.get("horizon_weeks", 4)
+                params["algorithm"]     = data.get("algorithm", "prophet")
+                params["train_weeks"]   = _int("train_weeks", data.get("train_weeks", 6))
+                params["horizon_weeks"] = (
+                    [_int("horizon_weeks", h) for h in horizon_raw]
+                    if isinstance(horizon_raw, list) else _int("horizon_weeks", horizon_raw)
+                )
+            elif kind == "comparison":
+                params["train_weeks"] = _int("train_weeks", data.get("train_weeks", 20))
+                params["test_days"]   = _int("test_days", data.get("test_days", 14))
+                if data.get("mode", "single") == "rolling":
+                    params["mode"]         = "rolling"
+                    params["folds"]        = _int("folds", data.get("folds", 5))
+                    params["step_days"]    = _int("step_days", data.get("step_days", 7))
+                    params["horizon_days"] = _int("horizon_days", data.get("horizon_days", 14))
+            elif kind == "tuning":
+                params["train_weeks"]  = _int("train_weeks", data.get("train_weeks", 20))
+                params["search"]       = data.get("search", "random")
+                params["n_candidates"] = _int("n_candidates", data.get("n_candidates", 20))
+                params["folds"]        = _int("folds", data.get("folds", 3))
+                params["step_days"]    = _int("step_days", data.get("step_days", 7))
+                params["horizon_days"] = _int("horizon_days", data.get("horizon_days", 14))
+                params["patience"]     = _int("patience", data.get("patience", 3))
+                if data.get("space") is not None:
+                    params["space"] = validate_space(data["space"])
+                for key in ("seed", "preset_name", "base_preset"):
+                    if data.get(key) is not None:
+                        params[key] = data[key]
+        except ValueError as e:
+            return _err(str(e))
+
+        with connect(_db()) as conn:
+            owner_row = conn.execute(
+                "SELECT id FROM datasets WHERE id = ? AND uploaded_by_user_id = ?",
+                (params["dataset_id"], _current_user_id()),
+            ).fetchone()
+            if not owner_row:
+                return _err("Dataset not found", 404)
+
+            try:
+                job_id = create_job(conn, _current_user_id(), kind, params)
+            except ValueError as e:
+                return _err(str(e))
+
+        submit_job(_db(), job_id)
+        return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+    @app.get("/api/v1/jobs/<string:job_id>")
+    @require_auth
+    def get_forecast_job(job_id: str):
+        """Return a job's status, plus its result once done (or error if it failed)."""
+        with connect(_db()) as conn:
+            job = get_job(conn, job_id, _current_user_id())
+        if not job:
+            return _err("Job not found", 404)
+        return jsonify({"success": True, **job})
+
     @app.get("/api/upload/datasets")
     @require_auth
     def list_user_datasets():
@@ -275,54 +570,32 @@ def register_routes(app: Flask) -> None:
         user_id = _current_user_id()
 
         with connect(_db()) as conn:
-            datasets = conn.execute(
-                """
-                SELECT id, name, source_filename, uploaded_at
-                FROM datasets
-                WHERE uploaded_by_user_id = ?
-                ORDER BY uploaded_at DESC, id DESC
-                """,
-                (user_id,),
-            ).fetchall()
-
-            response_rows = []
-            for ds in datasets:
-                sales_span = conn.execute(
-                    "SELECT MIN(date) AS start_date, MAX(date) AS end_date FROM sales WHERE dataset_id = ?",
-                    (int(ds["id"]),),
-                ).fetchone()
-                item_rows = conn.execute(
-                    """
-                    SELECT i.id AS item_id, i.name AS item_name
-                    FROM sales s
-                    JOIN items i ON i.id = s.item_id
-                    WHERE s.dataset_id = ?
-                    GROUP BY i.id, i.name
-                    ORDER BY i.name
-                    """,
-                    (int(ds["id"]),),
-                ).fetchall()
-
-                products = [row["item_name"] for row in item_rows]
-                item_ids = {row["item_name"]: int(row["item_id"]) for row in item_rows}
-
-                start_date = sales_span["start_date"]
-                end_date = sales_span["end_date"]
-
-                response_rows.append({
-                    "datasetId": int(ds["id"]),
-                    "fileName": ds["source_filename"] or ds["name"],
-                    "displayName": ds["name"],
-                    "products": products,
-                    "itemIds": item_ids,
-                    "dateRange": {
-                        "start": datetime.strptime(start_date, "%Y-%m-%d").strftime("%d/%m/%Y") if start_date else "",
-                        "end": datetime.strptime(end_date, "%Y-%m-%d").strftime("%d/%m/%Y") if end_date else "",
-                    },
-                    "uploadedAt": ds["uploaded_at"],
-                })
+            summaries = list_summaries(conn, user_id)
+
+        response_rows = []
+        for ds in summaries:
+            start_date = ds["start_date"]
+            end_date = ds["end_date"]
+
+            response_rows.append({
+                "datasetId": int(ds["id"]),
+                "fileName": ds["source_filename"] or ds["name"],
+                "displayName": ds["name"],
+                "products": [item["name"] for item in ds["items"]],
+                "itemIds": {item["name"]: int(item["item_id"]) for item in ds["items"]},
+                "dateRange": {
+                    "start": datetime.strptime(start_date, "%Y-%m-%d").strftime("%d/%m/%Y") if start_date else "",
+                    "end": datetime.strptime(end_date, "%Y-%m-%d").strftime("%d/%m/%Y") if end_date else "",
+                },
+                "rowCount": ds["row_count"] or 0,
+                "stats": {
+                    item["name"]: {"avg": item["avg"], "min": item["min"], "max": item["max"]}
+                    for item in ds["items"]
+                },
+                "uploadedAt": ds["uploaded_at"],
+            })
 
-            return jsonify({"success": True, "datasets": response_rows})
+        return jsonify({"success": True, "datasets": response_rows})
 
 
     # --- Prophet preset settings -------------------------------------------
@@ -409,6 +682,9 @@ def register_routes(app: Flask) -> None:
         """
         Upload and process a CSV file containing sales data.
         Stores data in database and returns validation/preview info.
+        Query params:
+          mode - 'memory', 'stream' (chunked, bounded memory) or 'auto'
+                 (default: stream when the upload exceeds UPLOAD_STREAM_THRESHOLD_MB)
         """
         import pandas as pd
         import io
@@ -425,6 +701,12 @@ def register_routes(app: Flask) -> None:
         if not file.filename.endswith('.csv'):
             return _err("File must be a CSV", 400)
         
+        mode = request.args.get("mode", "auto")
+        if mode not in {"auto", "memory", "stream"}:
+            return _err("mode must be 'auto', 'memory' or 'stream'", 400)
+        if mode == "stream" or (mode == "auto" and (request.content_length or 0) > UPLOAD_STREAM_THRESHOLD_BYTES):
+            return _upload_csv_stream(file)
+
         try:
             current_user_id = _current_user_id()
 
@@ -439,57 +721,13 @@ def register_routes(app: Flask) -> None:
             if raw_df.empty:
                 return _err("Uploaded CSV is empty", 400)
 
-            date_header_idx = None
-            for idx in range(len(raw_df)):
-                first_cell = str(raw_df.iloc[idx, 0]).strip().lower()
-                if first_cell == 'date':
-                    date_header_idx = idx
-                    break
-
-            if date_header_idx is not None:
-                header_row = raw_df.iloc[date_header_idx].fillna('').astype(str).str.strip()
-                data_start_idx = date_header_idx + 1
-
-                # Handle two-row headers, e.g.:
-                # Date,Number Sold,
-                # ,Cappuccino,Americano
-                if data_start_idx < len(raw_df):
-                    subheader_row = raw_df.iloc[data_start_idx].fillna('').astype(str).str.strip()
-                    first_subheader_cell = str(subheader_row.iloc[0]).strip().lower()
-                    has_named_subheaders = any(str(v).strip() for v in subheader_row.iloc[1:])
-                    if first_subheader_cell in {'', 'nan'} and has_named_subheaders:
-                        combined_header = []
-                        for col_idx in range(len(header_row)):
-                            if col_idx == 0:
-                                combined_header.append('Date')
-                                continue
-
-                            primary_name = str(header_row.iloc[col_idx]).strip()
-                            secondary_name = str(subheader_row.iloc[col_idx]).strip()
-                            if secondary_name:
-                                combined_header.append(secondary_name)
-                            elif primary_name and primary_name.lower() not in {'number sold', 'sales', 'quantity', 'qty'}:
-                                combined_header.append(primary_name)
-                            else:
-                                combined_header.append(f'Product {col_idx}')
-
-                        header_row = pd.Series(combined_header)
-                        data_start_idx += 1
-
-                df = raw_df.iloc[data_start_idx:].reset_index(drop=True)
-                df.columns = header_row
-            else:
-                # Fallback: headerless CSV. Treat first column as Date and synthesize product names.
-                first_value = str(raw_df.iloc[0, 0]).strip()
-                if not re.match(r"^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}$", first_value):
-                    return _err("CSV must include a 'Date' header, or start with date values in the first column", 400)
-
-                col_count = raw_df.shape[1]
-                if col_count < 2:
-                    return _err("CSV must have at least one product column", 400)
+            try:
+                columns, data_start_idx = detect_header(raw_df)
+            except IngestError as e:
+                return _err(str(e), 400)
 
-                df = raw_df.copy()
-                df.columns = ['Date'] + [f'Product {i}' for i in range(1, col_count)]
+            df = raw_df.iloc[data_start_idx:].reset_index(drop=True)
+            df.columns = columns
 
             # Normalize column names and drop fully empty columns.
             df.columns = [str(col).strip() for col in df.columns]
@@ -529,6 +767,15 @@ def register_routes(app: Flask) -> None:
             has_negatives = (df[product_cols] < 0).any().any()
             has_missing = df[product_cols].isnull().any().any()
             is_chronological = df['Date'].is_monotonic_increasing
+
+            # Calculate statistics
+            stats = {}
+            for col in product_cols:
+                stats[col] = {
+                    'avg': round(float(df[col].mean()), 1),
+                    'min': int(df[col].min()),
+                    'max': int(df[col].max())
+                }
             
             # Store in database
             with connect(_db()) as conn:
@@ -539,42 +786,15 @@ def register_routes(app: Flask) -> None:
                 )
                 dataset_id = cursor.lastrowid
                 
-                # Create/get item entries
-                item_ids = {}
-                for col in product_cols:
-                    # Try to categorize (simple heuristic)
-                    category = 'coffee' if 'coffee' in col.lower() or 'cappuccino' in col.lower() or 'americano' in col.lower() else 'food'
-                    
-                    cursor = conn.execute(
-                        "INSERT OR IGNORE INTO items (name, category) VALUES (?, ?)",
-                        (col, category)
-                    )
-                    
-                    item_row = conn.execute(
-                        "SELECT id FROM items WHERE name = ?", (col,)
-                    ).fetchone()
-                    item_ids[col] = item_row['id']
-                
-                # Insert sales data
-                for _, row in df.iterrows():
-                    date_str = row['Date'].strftime('%Y-%m-%d')
-                    for col in product_cols:
-                        quantity = int(row[col]) if pd.notna(row[col]) else 0
-                        conn.execute(
-                            "INSERT INTO sales (dataset_id, date, item_id, quantity) VALUES (?, ?, ?, ?)",
-                            (dataset_id, date_str, item_ids[col], quantity)
-                        )
-                
+                # Create/get item entries (one batch) and bulk-insert the sales rows
+                item_ids = ensure_items(conn, product_cols)
+                insert_sales(conn, dataset_id, df[['Date'] + product_cols], item_ids)
+                save_summary(conn, dataset_id, df['Date'].min(), df['Date'].max(), len(df), item_ids, stats)
                 conn.commit()
-            
-            # Calculate statistics
-            stats = {}
-            for col in product_cols:
-                stats[col] = {
-                    'avg': round(float(df[col].mean()), 1),
-                    'min': int(df[col].min()),
-                    'max': int(df[col].max())
-                }
+
+                # Columnar copy for fast history reads (commits)
+                export_dataset(conn, dataset_id)
+
             
             # Return validation and preview data
             return jsonify({
@@ -605,6 +825,109 @@ def register_routes(app: Flask) -> None:
             logging.exception("Failed to process CSV")
             return _err("Failed to process CSV. Please check the file and try again.", 500)
 
+    def _upload_csv_stream(file):
+        """Chunked variant of upload_csv for large files; same response shape."""
+        from werkzeug.utils import secure_filename
+
+        try:
+            with connect(_db()) as conn:
+                cursor = conn.execute(
+                    "INSERT INTO datasets (name, source_filename, uploaded_by_user_id) VALUES (?, ?, ?)",
+                    (secure_filename(file.filename), file.filename, _current_user_id())
+                )
+                dataset_id = cursor.lastrowid
+                try:
+                    summary = ingest_csv_stream(conn, dataset_id, file.stream, UPLOAD_CHUNK_ROWS)
+                except IngestError as e:
+                    conn.rollback()
+                    return _err(str(e), 400)
+
+                save_summary(
+                    conn,
+                    dataset_id,
+                    datetime.strptime(summary["dateRange"]["start"], "%d/%m/%Y"),
+                    datetime.strptime(summary["dateRange"]["end"], "%d/%m/%Y"),
+                    summary["rowCount"],
+                    summary["item_ids"],
+                    summary["stats"],
+                )
+                conn.commit()
+                export_dataset(conn, dataset_id)
+
+            return jsonify({
+                "success": True,
+                "dataset_id": dataset_id,
+                "fileName": file.filename,
+                "dateRange": summary["dateRange"],
+                "products": summary["products"],
+                "rowCount": summary["rowCount"],
+                "daysOfData": summary["rowCount"],
+                "monthsOfData": round(summary["rowCount"] / 30.4, 1),
+                "stats": summary["stats"],
+                "preview": summary["preview"],
+                "validationChecks": summary["validationChecks"],
+                "item_ids": summary["item_ids"],
+            })
+        except Exception:
+            logging.exception("Failed to process CSV (stream mode)")
+            return _err("Failed to process CSV. Please check the file and try again.", 500)
+
+    @app.post("/api/upload/dataset/<int:dataset_id>/append")
+    @require_auth
+    def append_csv(dataset_id: int):
+        """
+        Add the new days of a CSV file (same formats as upload_csv) to an
+        existing dataset instead of uploading it again as a new one.
+        Days an item already has are left unchanged; new products are
+        added. All new rows go in one transaction, and only the stored
+        results of items that gained days are invalidated. The response
+        reports the rows added and the date range that changed, overall
+        (changedRange, null if nothing was new) and per product
+        (changedItems).
+        """
+        if 'file' not in request.files:
+            return _err("No file uploaded", 400)
+
+        file = request.files['file']
+
+        if file.filename == '':
+            return _err("No file selected", 400)
+
+        if not file.filename.endswith('.csv'):
+            return _err("File must be a CSV", 400)
+
+        try:
+            with connect(_db()) as conn:
+                dataset = conn.execute(
+                    "SELECT id FROM datasets WHERE id = ? AND uploaded_by_user_id = ?",
+                    (dataset_id, _current_user_id())
+                ).fetchone()
+                if not dataset:
+                    return _err("Dataset not found", 404)
+
+                try:
+                    summary = append_csv_stream(conn, dataset_id, file.stream, UPLOAD_CHUNK_ROWS)
+                except IngestError as e:
+                    conn.rollback()
+                    return _err(str(e), 400)
+
+                if summary["rowsAdded"]:
+                    refresh_summary(conn, dataset_id)
+                    invalidate_items(
+                        conn, dataset_id, [summary["item_ids"][col] for col in summary["changedItems"]]
+                    )
+                    # Drop the old column file in this transaction, so no
+                    # reader pairs it with the new rows (and stores a forecast
+                    # of stale sales); they read SQL until export_dataset
+                    drop_dataset(conn, dataset_id)
+                    conn.commit()
+                    export_dataset(conn, dataset_id)
+
+            return jsonify({"success": True, "dataset_id": dataset_id, "fileName": file.filename, **summary})
+        except Exception:
+            logging.exception("Failed to append CSV")
+            return _err("Failed to process CSV. Please check the file and try again.", 500)
+
     @app.delete("/api/upload/dataset/<int:dataset_id>")
     @require_auth
     def delete_dataset(dataset_id: int):
@@ -624,7 +947,9 @@ def register_routes(app: Flask) -> None:
                 if not dataset:
                     return _err("Dataset not found", 404)
                 
-                # Delete dataset (sales will cascade delete due to foreign key)
+                # Delete dataset (sales and its summary cascade delete due to foreign keys)
+                invalidate_dataset(conn, dataset_id)
+                drop_dataset(conn, dataset_id)
                 conn.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
                 conn.commit()
                 
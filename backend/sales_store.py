@@ -0,0 +1,217 @@
+"""
+Columnar on-disk copy of each dataset's sales history.
+
+The sales table stays the source of truth and the index for ad-hoc
+queries. On top of it, every dataset gets one immutable .npy file holding
+a (2, n) int32 array: row 0 is the day number (days since 1970-01-01, as
+in sales.day) and row 1 the quantity, with each item's rows contiguous and
+in date order.
+The sales_columns table maps (dataset_id, item_id) to that file and the
+item's [start, stop) slice of it.
+
+read_item() / read_dataset() memory-map the file and return slices of it
+without copying; forecasting.load_history and load_dataset_histories use
+them and fall back to SQL whenever they return None (SALES_STORE=sqlite,
+a dataset not exported yet, or a file replaced while being read).
+
+A dataset is re-exported under a fresh file name and swapped in through
+sales_columns, so a reader never sees a half-written file. Call
+drop_dataset() in the transaction that adds or deletes sales rows and
+export_dataset() after committing new ones; backfill_columns() runs once
+on startup from db.init_db.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config import SALES_STORE, SALES_STORE_DIR
+from metrics import timed
+
+# Memory maps kept open per process. Files are immutable (a re-export
+# writes a new one), so a cached map never goes stale.
+_MAX_OPEN_MAPS = 64
+_maps: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_maps_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return SALES_STORE == "columnar"
+
+
+def _store_dir(conn: sqlite3.Connection) -> Optional[str]:
+    """Directory for this database's column files (None for in-memory databases)."""
+    if SALES_STORE_DIR:
+        return SALES_STORE_DIR
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not db_file:
+        return None
+    return os.path.join(os.path.dirname(db_file), "sales_columns")
+
+
+def export_dataset(conn: sqlite3.Connection, dataset_id: int) -> Optional[str]:
+    """
+    (Re)write a dataset's column file from its sales rows and commit.
+
+    Call after the sales rows are committed. Returns the new file's path, or
+    None if the store is disabled or the dataset has no sales.
+    """
+    directory = _store_dir(conn) if enabled() else None
+    if directory is None:
+        return None
+
+    with timed("sql", "export_columns"):
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # Primary-key order, so the rows come back sorted without a sort step
+        rows = cursor.execute(
+            "SELECT item_id, day, quantity FROM sales WHERE dataset_id = ? ORDER BY item_id, day",
+            (dataset_id,),
+        ).fetchall()
+
+    path = None
+    index_rows = []
+    if rows:
+        item_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        columns = np.empty((2, len(rows)), dtype=np.int32)
+        columns[0] = np.fromiter((row[1] for row in rows), dtype=np.int32, count=len(rows))
+        columns[1] = np.fromiter((row[2] for row in rows), dtype=np.int32, count=len(rows))
+
+        # Write under a temporary name, then publish the finished file
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{dataset_id}-{uuid.uuid4().hex}.npy"
+        path = os.path.join(directory, filename)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, columns)
+        os.replace(path + ".tmp", path)
+
+        starts = np.flatnonzero(np.r_[True, item_ids[1:] != item_ids[:-1]])
+        stops = np.r_[starts[1:], len(item_ids)]
+        index_rows = [
+            (dataset_id, int(item_ids[start]), filename, int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        ]
+
+    # DELETE ... RETURNING takes the write lock before reading the old file
+    # names, so concurrent exports can't leave a file behind unreferenced
+    old_files = {
+        row[0] for row in conn.execute(
+            "DELETE FROM sales_columns WHERE dataset_id = ? RETURNING file", (dataset_id,)
+        ).fetchall()
+    }
+    conn.executemany(
+        "INSERT INTO sales_columns (dataset_id, item_id, file, start, stop) VALUES (?, ?, ?, ?, ?)",
+        index_rows,
+    )
+    conn.commit()
+    _remove_files(directory, old_files)
+    return path
+
+
+def drop_dataset(conn: sqlite3.Connection, dataset_id: int) -> None:
+    """Remove a dataset's column file and index rows. Does not commit."""
+    directory = _store_dir(conn)
+    old_files = {
+        row[0] for row in conn.execute(
+            "DELETE FROM sales_columns WHERE dataset_id = ? RETURNING file", (dataset_id,)
+        ).fetchall()
+    }
+    if directory is not None:
+        # Readers that still hold the old name fall back to SQL
+        _remove_files(directory, old_files)
+
+
+def backfill_columns(conn: sqlite3.Connection) -> int:
+    """Export datasets that have sales but no column file yet. Commits."""
+    if not enabled() or _store_dir(conn) is None:
+        return 0
+    missing = conn.execute(
+        """
+        SELECT d.id FROM datasets d
+        WHERE NOT EXISTS (SELECT 1 FROM sales_columns c WHERE c.dataset_id = d.id)
+          AND EXISTS (SELECT 1 FROM sales s WHERE s.dataset_id = d.id)
+        """
+    ).fetchall()
+    conn.commit()
+    for row in missing:
+        export_dataset(conn, int(row[0]))
+    return len(missing)
+
+
+def read_item(conn: sqlite3.Connection, dataset_id: int, item_id: int):
+    """
+    Return (days, quantities) int32 views of one item's history, in date
+    order, or None if the dataset isn't in the column store.
+    """
+    if not enabled():
+        return None
+    row = conn.execute(
+        "SELECT file, start, stop FROM sales_columns WHERE dataset_id = ? AND item_id = ?",
+        (dataset_id, item_id),
+    ).fetchone()
+    if row is None:
+        return None
+    columns = _open(conn, row[0])
+    if columns is None:
+        return None
+    return columns[0, row[1]:row[2]], columns[1, row[1]:row[2]]
+
+
+def read_dataset(conn: sqlite3.Connection, dataset_id: int):
+    """
+    Return [(item_id, days, quantities), ...] views for every item of a
+    dataset, ordered by item_id, or None if it isn't in the column store.
+    """
+    if not enabled():
+        return None
+    rows = conn.execute(
+        "SELECT item_id, file, start, stop FROM sales_columns WHERE dataset_id = ? ORDER BY item_id",
+        (dataset_id,),
+    ).fetchall()
+    if not rows:
+        return None
+    columns = _open(conn, rows[0][1])
+    if columns is None:
+        return None
+    return [(int(row[0]), columns[0, row[2]:row[3]], columns[1, row[2]:row[3]]) for row in rows]
+
+
+def _open(conn: sqlite3.Connection, filename: str):
+    """Memory-map a column file (cached), or None if it is gone."""
+    directory = _store_dir(conn)
+    if directory is None:
+        return None
+    path = os.path.join(directory, filename)
+    with _maps_lock:
+        columns = _maps.get(path)
+        if columns is not None:
+            _maps.move_to_end(path)
+            return columns
+    try:
+        columns = np.load(path, mmap_mode="r")
+    except OSError:
+        return None
+    with _maps_lock:
+        _maps[path] = columns
+        while len(_maps) > _MAX_OPEN_MAPS:
+            _maps.popitem(last=False)
+    return columns
+
+
+def _remove_files(directory: str, filenames) -> None:
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        with _maps_lock:
+            _maps.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.warning("Could not remove old sales column file %s", path)
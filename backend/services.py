@@ -1,22 +1,59 @@
 """
 Password helpers for the Pink Cafe backend.
 Uses bcrypt for secure storage - passwords are never stored in plain text.
+
+Hashing runs on a small dedicated thread pool (bcrypt releases the GIL),
+so at most PASSWORD_HASH_WORKERS cores are spent on it however many
+logins arrive at once. Callers still get a plain synchronous API.
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT, PASSWORD_HASH_WORKERS
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many password hashes are already queued."""
+    pass
+
+
+_executor = ThreadPoolExecutor(max_workers=max(1, PASSWORD_HASH_WORKERS), thread_name_prefix="bcrypt")
+# Bounds queued + running hashes so a login burst can't build an unbounded backlog
+_slots = threading.BoundedSemaphore(max(1, PASSWORD_HASH_MAX_PENDING))
+
+
+def _run_hashing(fn, *args):
+    """Run a bcrypt call on the hashing pool and wait for its result."""
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise HashingBusyError("Too many sign-in attempts in progress, please retry shortly")
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
 
 def hash_password(password: str) -> str:
-    """Hash a plain-text password with bcrypt (cost 12)."""
+    """Hash a plain-text password with bcrypt (cost BCRYPT_ROUNDS, default 12)."""
     if not password:
         raise ValueError("password is required")
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=12)).decode("utf-8")
+    return _run_hashing(_hash, password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Return True if the plain-text password matches the stored bcrypt hash."""
     if not password or not password_hash:
         return False
+    return _run_hashing(_check, password, password_hash)
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def _check(password: str, password_hash: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
     except Exception:
@@ -0,0 +1,217 @@
+"""
+Session tokens for the Pink Cafe backend.
+
+Tokens live in the sessions table; validated tokens are also kept in a
+small in-process cache so require_auth is usually an indexed read of new
+revocations plus a dictionary lookup, instead of a token query. A cached
+entry is kept until the session's own expires_at or
+SESSION_CACHE_TTL_SECONDS, whichever comes first.
+
+A logout deletes the session and logs the token in session_revocations.
+Each process remembers the last revocation id it has applied and, before
+trusting its cache, drops the tokens of any newer rows - so a logout in
+one gunicorn worker is enforced by the others on their next request.
+
+create_session() / revoke_session() / lookup_session() are called from
+routes.py; start_session_sweeper() is called once on startup from app.py.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config import (
+    SESSION_CACHE_SIZE,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_LIFETIME_HOURS,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+)
+from db import connect
+from executors import is_main_process
+
+# sessions.expires_at is stored as UTC text in SQLite's datetime() format
+_EXPIRES_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class SessionCache:
+    """Thread-safe, bounded LRU of token -> (user_id, valid_until epoch seconds)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        # Id of the last session_revocations row applied (None: not read yet)
+        self.revision: Optional[int] = None
+        self._entries: "OrderedDict[str, tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[int]:
+        """Return the cached user id for token, or None if absent or stale."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user_id, valid_until = entry
+            if valid_until <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user_id
+
+    def put(self, token: str, user_id: int, expires_at: float,
+            revision: Optional[int] = None) -> None:
+        """
+        Cache a validated token until expires_at (capped by the TTL).
+
+        revision is the revocation id the token was validated against; if
+        newer revocations have been applied since, the token may be one of
+        them and is not cached.
+        """
+        if self.max_entries == 0:
+            return
+        valid_until = min(expires_at, time.time() + self.ttl_seconds)
+        with self._lock:
+            if revision is not None and self.revision is not None and self.revision > revision:
+                return
+            self._entries[token] = (int(user_id), valid_until)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def apply_revocations(self, revision: int, tokens) -> None:
+        """Drop revoked tokens and record revision as the last revocation applied."""
+        with self._lock:
+            for token in tokens:
+                self._entries.pop(token, None)
+            if self.revision is None or revision > self.revision:
+                self.revision = revision
+
+    def purge_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            for token in [t for t, (_, until) in self._entries.items() if until <= now]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.revision = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared per-process cache used by require_auth
+SESSION_CACHE = SessionCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL_SECONDS)
+
+
+def create_session(db_path: str, user_id: int) -> str:
+    """Issue a new session token for user_id and return it."""
+    token = secrets.token_urlsafe(32)
+    expires = datetime.now(timezone.utc) + timedelta(hours=SESSION_LIFETIME_HOURS)
+    with connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
+            (token, int(user_id), expires.strftime(_EXPIRES_FORMAT)),
+        )
+        conn.commit()
+    SESSION_CACHE.put(token, user_id, expires.timestamp())
+    return token
+
+
+def _sync_revocations(conn) -> int:
+    """Apply revocations logged since this process last looked; return the revision."""
+    # Rows older than the cache TTL are purged, so the first read stays small
+    seen = SESSION_CACHE.revision or 0
+    rows = conn.execute(
+        "SELECT id, token FROM session_revocations WHERE id > ? ORDER BY id", (seen,)
+    ).fetchall()
+    if not rows:
+        SESSION_CACHE.apply_revocations(seen, ())
+        return seen
+    SESSION_CACHE.apply_revocations(rows[-1]["id"], [row["token"] for row in rows])
+    return rows[-1]["id"]
+
+
+def lookup_session(db_path: str, token: str) -> Optional[int]:
+    """Return the user id for a valid, unexpired token, or None."""
+    with connect(db_path) as conn:
+        revision = _sync_revocations(conn)
+        user_id = SESSION_CACHE.get(token)
+        if user_id is not None:
+            return user_id
+
+        row = conn.execute(
+            "SELECT user_id, expires_at FROM sessions WHERE token = ? AND expires_at > datetime('now')",
+            (token,)
+        ).fetchone()
+    if not row:
+        return None
+
+    expires = datetime.strptime(row["expires_at"], _EXPIRES_FORMAT).replace(tzinfo=timezone.utc)
+    SESSION_CACHE.put(token, row["user_id"], expires.timestamp(), revision)
+    return int(row["user_id"])
+
+
+def revoke_session(db_path: str, token: str) -> None:
+    """Delete a session (logout), drop it from this cache and log it for the others."""
+    SESSION_CACHE.discard(token)
+    with connect(db_path) as conn:
+        deleted = conn.execute("DELETE FROM sessions WHERE token = ?", (token,)).rowcount
+        if deleted:
+            conn.execute("INSERT INTO session_revocations (token) VALUES (?)", (token,))
+        conn.commit()
+
+
+def purge_expired_sessions(db_path: str) -> int:
+    """Delete expired session rows and return how many were removed."""
+    SESSION_CACHE.purge_expired()
+    with connect(db_path) as conn:
+        cursor = conn.execute("DELETE FROM sessions WHERE expires_at <= datetime('now')")
+        # A revoked token can't be cached anywhere once a full TTL has passed
+        conn.execute(
+            "DELETE FROM session_revocations WHERE revoked_at <= datetime('now', ?)",
+            (f"-{int(SESSION_CACHE_TTL_SECONDS) + 1} seconds",),
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+_sweeper_lock = threading.Lock()
+_sweeper_started = False
+
+
+def start_session_sweeper(db_path: str, interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS) -> bool:
+    """
+    Start a daemon thread that purges expired sessions every interval_seconds.
+
+    Runs at most once per process, never inside pool child processes, and
+    not at all if the interval is 0. Returns True if a thread was started.
+    """
+    global _sweeper_started
+    if interval_seconds <= 0 or not is_main_process():
+        return False
+    with _sweeper_lock:
+        if _sweeper_started:
+            return False
+        _sweeper_started = True
+
+    def sweep():
+        while True:
+            try:
+                removed = purge_expired_sessions(db_path)
+                if removed:
+                    logging.info("Removed %d expired sessions", removed)
+            except Exception:
+                logging.exception("Session sweep failed")
+            time.sleep(interval_seconds)
+
+    threading.Thread(target=sweep, name="session-sweeper", daemon=True).start()
+    return True
@@ -45,6 +45,19 @@ expect_body() {
     fi
 }
 
+# Assert a response header is present (case-insensitive substring of the headers)
+expect_header() {
+    local label="$1" needle="$2"
+    shift 2
+    local headers
+    headers=$(curl -s -o /dev/null -D - "$@" | tr -d '\r')
+    if echo "$headers" | grep -qi "$needle"; then
+        pass "$label"
+    else
+        fail "$label" "expected header '$needle' in response: $(echo "$headers" | tr '\n' ' ')"
+    fi
+}
+
 echo "Smoke testing: $BASE_URL"
 echo "-------------------------------------------"
 
@@ -54,6 +67,9 @@ echo "-------------------------------------------"
 expect_status "GET /api health check" 200 \
     "$BASE_URL/api"
 
+expect_status "GET /api/metrics — no token → 401" 401 \
+    "$BASE_URL/api/metrics"
+
 # ---------------------------------------------------------------------------
 # Auth
 # ---------------------------------------------------------------------------
@@ -82,11 +98,14 @@ TOKEN=$(curl -s -X POST "$BASE_URL/api/v1/auth/login" \
 
 if [[ -z "$TOKEN" ]]; then
     echo -e "${RED}FATAL: Could not obtain auth token — skipping authenticated tests${RESET}"
-    FAIL=$((FAIL + 12))
+    FAIL=$((FAIL + 26))
 else
     pass "Obtained auth token"
     AUTH=(-H "Authorization: Bearer $TOKEN")
 
+    expect_status "GET /api/metrics → 200" 200 \
+        "${AUTH[@]}" "$BASE_URL/api/metrics"
+
     # ---------------------------------------------------------------------------
     # Prophet presets (authenticated)
     # ---------------------------------------------------------------------------
@@ -118,6 +137,65 @@ else
     expect_status "DELETE /api/prophet/presets/Default → 400 (protected)" 400 \
         -X DELETE "${AUTH[@]}" "$BASE_URL/api/prophet/presets/Default"
 
+    # ---------------------------------------------------------------------------
+    # Forecast (authenticated)
+    # ---------------------------------------------------------------------------
+    expect_status "GET /api/v1/forecast — bad horizon list → 400" 400 \
+        "${AUTH[@]}" "$BASE_URL/api/v1/forecast?dataset_id=1&item_id=1&horizon_weeks=1,abc"
+
+    expect_body "Multi-horizon forecast returns JSON with success field" '"success"' \
+        "${AUTH[@]}" "$BASE_URL/api/v1/forecast?dataset_id=1&item_id=1&horizon_weeks=1,4,8&train_weeks=20"
+
+    expect_status "GET /api/v1/forecast/bulk — missing dataset_id → 400" 400 \
+        "${AUTH[@]}" "$BASE_URL/api/v1/forecast/bulk"
+
+    # ---------------------------------------------------------------------------
+    # Forecast formats and compression (authenticated, on an uploaded dataset)
+    # ---------------------------------------------------------------------------
+    CSV_FILE="$(dirname "$0")/../CSV_Files/Pink CoffeeSales March - Oct 2025.csv"
+    UPLOAD=$(curl -s -X POST "${AUTH[@]}" "$BASE_URL/api/upload/csv" \
+        -F "file=@$CSV_FILE;filename=smoke.csv")
+    DATASET_ID=$(echo "$UPLOAD" | grep -o '"dataset_id": *[0-9]*' | grep -o '[0-9]*$')
+    ITEM_ID=$(echo "$UPLOAD" | grep -o '"item_ids": *{[^}]*}' | grep -o ': *[0-9]*' | grep -o '[0-9]*$' | head -1)
+
+    if [[ -z "$DATASET_ID" || -z "$ITEM_ID" ]]; then
+        fail "POST /api/upload/csv — smoke dataset" "no dataset_id / item_ids in response: $UPLOAD"
+        FAIL=$((FAIL + 4))
+    else
+        pass "POST /api/upload/csv — smoke dataset"
+        FORECAST_URL="$BASE_URL/api/v1/forecast?dataset_id=$DATASET_ID&item_id=$ITEM_ID&algorithm=baseline&train_weeks=8&horizon_weeks=1,4,52"
+
+        expect_header "Forecast with Accept-Encoding: br → brotli" "content-encoding: br" \
+            "${AUTH[@]}" -H "Accept-Encoding: br" "$FORECAST_URL"
+
+        expect_header "Forecast with Accept-Encoding: gzip → gzip" "content-encoding: gzip" \
+            "${AUTH[@]}" -H "Accept-Encoding: gzip" "$FORECAST_URL"
+
+        expect_header "Forecast with format=msgpack → MessagePack" "content-type: application/x-msgpack" \
+            "${AUTH[@]}" "$FORECAST_URL&format=msgpack"
+
+        expect_status "DELETE /api/upload/dataset/<smoke dataset> → 200" 200 \
+            -X DELETE "${AUTH[@]}" "$BASE_URL/api/upload/dataset/$DATASET_ID"
+    fi
+
+    # ---------------------------------------------------------------------------
+    # Dataset append (authenticated)
+    # ---------------------------------------------------------------------------
+    expect_status "POST /api/upload/dataset/999999/append — unknown dataset → 404" 404 \
+        -X POST "${AUTH[@]}" "$BASE_URL/api/upload/dataset/999999/append" \
+        -F "file=@/dev/null;filename=week.csv"
+
+    # ---------------------------------------------------------------------------
+    # Background jobs (authenticated)
+    # ---------------------------------------------------------------------------
+    expect_status "POST /api/v1/jobs — missing params → 400" 400 \
+        -X POST "${AUTH[@]}" "$BASE_URL/api/v1/jobs" \
+        -H "Content-Type: application/json" \
+        -d '{"kind":"comparison"}'
+
+    expect_status "GET /api/v1/jobs/unknown → 404" 404 \
+        "${AUTH[@]}" "$BASE_URL/api/v1/jobs/does-not-exist"
+
     # ---------------------------------------------------------------------------
     # Algorithm comparison (authenticated)
     # ---------------------------------------------------------------------------
@@ -129,6 +207,15 @@ else
 
     expect_body "Compare endpoint returns JSON with success field" '"success"' \
         "${AUTH[@]}" "$BASE_URL/api/v1/forecast/compare?dataset_id=1&item_id=1&train_weeks=20&test_days=14"
+
+    # ---------------------------------------------------------------------------
+    # Logout (run last - it revokes TOKEN)
+    # ---------------------------------------------------------------------------
+    expect_status "POST /api/v1/auth/logout → 200" 200 \
+        -X POST "${AUTH[@]}" "$BASE_URL/api/v1/auth/logout"
+
+    expect_status "Revoked token is rejected → 401" 401 \
+        "${AUTH[@]}" "$BASE_URL/api/upload/datasets"
 fi
 
 # ---------------------------------------------------------------------------
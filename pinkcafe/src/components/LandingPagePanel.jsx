@@ -2,8 +2,8 @@ import React, { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import { FaChartLine, FaBullseye, FaShoppingBag, FaTrophy, FaDownload, FaHome, FaTable } from 'react-icons/fa';
 import { API_BASE_URL, STORAGE_KEYS } from '../config/constants';
-import { authFetch } from '../utils/apiUtils';
-import { filterForecastFromToday, transformProphetData, calcForecastTrend, getTrainingDays, getMaxForecastMonths, CHART_COLORS } from '../utils/chartUtils';
+import { authFetch, readNdjson } from '../utils/apiUtils';
+import { filterForecastFromToday, forecastRowsFromColumns, transformProphetData, calcForecastTrend, getTrainingDays, getMaxForecastMonths, CHART_COLORS } from '../utils/chartUtils';
 import MultiLineChart from './landing/MultiLineChart';
 import { LoadingOverlay, ChartLegend, DatasetSelector } from './landing/Widgets';
 import { InsightsPanel, ModelPanel, ForecastControlPanel } from './landing/Panels';
@@ -140,23 +140,35 @@ function LandingPagePanel() {
 
             const forecasts7Days = [], forecasts8Weeks = [], forecastsMonth = [], forecastsYear = [];
 
-            for (const productName of uploadedData.products) {
-                const itemId = uploadedData.itemIds[productName];
-                const displayName = uploadedData.displayName || productName;
-                try {
-                    const [res7, res8, resM, resY] = await Promise.all([
-                        authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizon7Days}&train_weeks=20&_t=${Date.now()}`),
-                        authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizon8Weeks}&train_weeks=20&_t=${Date.now()}`),
-                        authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizonMonth}&train_weeks=20&_t=${Date.now()}`),
-                        authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizonYear}&train_weeks=20&_t=${Date.now()}`),
-                    ]);
-                    const [data7, data8, dataM, dataY] = await Promise.all([res7.json(), res8.json(), resM.json(), resY.json()]);
-                    if (res7.ok) forecasts7Days.push({ ...filterForecastFromToday(data7), item_name: displayName, product_name: productName });
-                    if (res8.ok) forecasts8Weeks.push({ ...filterForecastFromToday(data8), item_name: displayName, product_name: productName });
-                    if (resM.ok) forecastsMonth.push({ ...filterForecastFromToday(dataM), item_name: displayName, product_name: productName });
-                    if (resY.ok) forecastsYear.push({ ...filterForecastFromToday(dataY), item_name: displayName, product_name: productName });
-                } catch (error) { console.error(`Error fetching forecast for ${productName}:`, error); }
+            // One streamed request for the whole dataset: the backend fits every item once
+            // (in parallel) and slices each horizon, sending items back as they finish
+            const horizons = [horizon7Days, horizon8Weeks, horizonMonth, horizonYear];
+            const productByItemId = Object.fromEntries(Object.entries(uploadedData.itemIds || {}).map(([name, id]) => [String(id), name]));
+            const productOrder = (name) => uploadedData.products.indexOf(name);
+            const displayName = uploadedData.displayName;
+
+            const res = await authFetch(`${API_BASE_URL}/api/v1/forecast/bulk?dataset_id=${datasetId}&algorithm=prophet&horizon_weeks=${horizons.join(',')}&train_weeks=20&_t=${Date.now()}`);
+            if (!res.ok) {
+                const data = await res.json().catch(() => ({}));
+                throw new Error(data.message || 'Failed to generate forecasts');
             }
+            await readNdjson(res, (item) => {
+                const productName = productByItemId[String(item.item_id)];
+                if (!productName || !item.success || !item.forecasts) {
+                    if (item.item_id && !item.success) console.error(`Error fetching forecast for ${productName || item.item_id}:`, item.message);
+                    return;
+                }
+                const { forecasts, ...meta } = item;
+                const sliceFor = (h) => ({ ...filterForecastFromToday({ ...meta, horizon_weeks: h, forecast: forecasts[String(h)] || [] }), item_name: displayName || productName, product_name: productName });
+                forecasts7Days.push(sliceFor(horizon7Days));
+                forecasts8Weeks.push(sliceFor(horizon8Weeks));
+                forecastsMonth.push(sliceFor(horizonMonth));
+                forecastsYear.push(sliceFor(horizonYear));
+            });
+
+            // Items stream back in completion order; keep the dataset's product order for stable colours
+            const byProduct = (a, b) => productOrder(a.product_name) - productOrder(b.product_name);
+            [forecasts7Days, forecasts8Weeks, forecastsMonth, forecastsYear].forEach((list) => list.sort(byProduct));
 
             setForecast7Days(forecasts7Days); setForecast8Weeks(forecasts8Weeks); setForecastMonth(forecastsMonth); setForecastYear(forecastsYear);
             setHasGenerated(true); setLastGenerated(new Date());
@@ -237,11 +249,11 @@ function LandingPagePanel() {
             for (const productName of uploadedData.products) {
                 const itemId = uploadedData.itemIds[productName];
                 try {
-                    const response = await authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizon_weeks}&train_weeks=20&_t=${Date.now()}`);
+                    const response = await authFetch(`${API_BASE_URL}/api/v1/forecast?dataset_id=${datasetId}&item_id=${itemId}&algorithm=prophet&horizon_weeks=${horizon_weeks}&train_weeks=20&format=columns&_t=${Date.now()}`);
                     const data = await response.json();
                     if (!response.ok) continue;
                     if (data?.forecast) {
-                        const filteredForecast = data.forecast.filter(f => {
+                        const filteredForecast = forecastRowsFromColumns(data.forecast).filter(f => {
                             const fd = new Date(f.date); fd.setHours(0,0,0,0);
                             const cs = new Date(customStartDate); cs.setHours(0,0,0,0);
                             const ce = new Date(customEndDate); ce.setHours(0,0,0,0);
@@ -12,3 +12,29 @@ export function authFetch(url, options = {}) {
   };
   return fetch(url, { ...options, headers });
 }
+
+/**
+ * Read an NDJSON (newline-delimited JSON) response, calling onItem(obj) for
+ * each line as soon as it arrives. Resolves once the stream ends.
+ */
+export async function readNdjson(response, onItem) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+    let newline;
+    while ((newline = buffer.indexOf('\n')) >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) onItem(JSON.parse(line));
+    }
+
+    if (done) break;
+  }
+
+  if (buffer.trim()) onItem(JSON.parse(buffer));
+}
@@ -46,6 +46,20 @@ export function filterForecastFromToday(forecastData) {
     return { ...forecastData, forecast: filteredForecast };
 }
 
+// Expand a columnar forecast (?format=columns: start date + one array per
+// series, a value per day) back into { date, yhat, yhat_lower, yhat_upper } rows
+export function forecastRowsFromColumns(columns) {
+    if (!columns || !columns.start) return [];
+    const start = Date.parse(`${columns.start}T00:00:00Z`);
+    const dayMs = 24 * 60 * 60 * 1000;
+    return columns.yhat.map((yhat, i) => ({
+        date: new Date(start + i * dayMs).toISOString().slice(0, 10),
+        yhat,
+        yhat_lower: columns.yhat_lower[i],
+        yhat_upper: columns.yhat_upper[i],
+    }));
+}
+
 export function transformProphetData(forecast, range) {
     if (!forecast || !forecast.length) return [];
 